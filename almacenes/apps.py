@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AlmacenesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'almacenes'
+
+    def ready(self):
+        """Registrar señales del módulo"""
+        import almacenes.signals  # noqa: F401
@@ -0,0 +1,87 @@
+# ======================================================
+# almacenes/cache.py
+# Caché de tablas de configuración (estados y tipos por código)
+#
+# Las señales de signals.py invalidan esta caché, pero con el backend por defecto
+# (LocMemCache, sin CACHES en settings) solo en el proceso que guardó el cambio:
+# los demás workers pueden ver datos viejos hasta que venza el TTL de cada clave.
+# ======================================================
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Ventana máxima en la que otro worker puede seguir viendo un registro ya modificado
+TIEMPO_CACHE_CODIGOS = 5 * 60
+CLAVE_VERSION_CODIGOS = 'almacenes:codigos:version'
+
+
+def _version_codigos():
+    return cache.get_or_set(CLAVE_VERSION_CODIGOS, time.time_ns, None)
+
+
+def obtener_por_codigo(modelo, codigo):
+    """
+    Obtener un registro activo de una tabla de configuración por su código.
+
+    Lanza ``modelo.DoesNotExist`` igual que ``modelo.objects.get(codigo=codigo, activo=True)``.
+    """
+    clave = f'almacenes:codigos:{_version_codigos()}:{modelo.__name__}:{codigo}'
+    return cache.get_or_set(
+        clave,
+        lambda: modelo.objects.get(codigo=codigo, activo=True),
+        TIEMPO_CACHE_CODIGOS
+    )
+
+
+def limpiar_cache_codigos(**kwargs):
+    """Invalidar la caché de códigos (receptor de post_save/post_delete)"""
+    # Una versión nueva deja inalcanzables todas las claves anteriores
+    cache.set(CLAVE_VERSION_CODIGOS, time.time_ns(), None)
+
+
+# ========== RESPUESTAS DE LOTES (resumen / estadísticas) ==========
+
+TIEMPO_CACHE_LOTES = 60
+CLAVE_ESTADISTICAS_LOTES = 'almacenes:lotes:estadisticas'
+
+
+def clave_resumen_lote(lote_id):
+    return f'almacenes:lote:{lote_id}:resumen'
+
+
+CLAVE_VERSION_ESTADISTICAS_MATERIALES = 'almacenes:materiales:estadisticas:version'
+
+
+def clave_estadisticas_materiales(parametros):
+    """Clave de las estadísticas de materiales para los filtros (QueryDict) de la petición"""
+    version = cache.get_or_set(CLAVE_VERSION_ESTADISTICAS_MATERIALES, time.time_ns, None)
+    filtros = urlencode(sorted(parametros.lists()), doseq=True)
+    return f'almacenes:materiales:estadisticas:{version}:{hashlib.md5(filtros.encode()).hexdigest()}'
+
+
+def invalidar_cache_lote(lote_id=None):
+    """
+    Descartar el resumen del lote y las estadísticas generales de lotes y de materiales.
+
+    Se ejecuta al confirmar la transacción en curso (de inmediato si no hay ninguna):
+    invalidar antes del COMMIT dejaría que otra petición vuelva a cachear los datos viejos.
+    """
+    claves = [CLAVE_ESTADISTICAS_LOTES]
+    if lote_id is not None:
+        claves.append(clave_resumen_lote(lote_id))
+
+    def invalidar():
+        cache.delete_many(claves)
+        # Las estadísticas de materiales se guardan por combinación de filtros: se invalidan por versión
+        cache.set(CLAVE_VERSION_ESTADISTICAS_MATERIALES, time.time_ns(), None)
+
+    transaction.on_commit(invalidar)
+
+
+def limpiar_cache_lote(sender, instance, **kwargs):
+    """Receptor de post_save/post_delete para Lote y sus relaciones (detalles, entregas, materiales)"""
+    lote_id = instance.pk if sender.__name__ == 'Lote' else instance.lote_id
+    invalidar_cache_lote(lote_id)
@@ -0,0 +1,70 @@
+# ======================================================
+# almacenes/importacion.py
+# Lectura de archivos CSV/Excel para la importación masiva
+# ======================================================
+import re
+from itertools import islice
+
+import openpyxl
+import pandas as pd
+
+
+# Formato de MAC validado en la importación (compilado una vez por módulo)
+PATRON_MAC = re.compile(r'^([0-9A-F]{2}[:-]){5}([0-9A-F]{2})$')
+
+# Tamaño máximo del archivo subido (se rechaza antes de leerlo)
+TAMANO_MAXIMO_ARCHIVO = 5 * 1024 * 1024
+
+
+def item_equipo_valido(valor):
+    """ITEM_EQUIPO: entre 6 y 10 dígitos (isdigit + len, sin pasar por el motor de regex)"""
+    return 6 <= len(valor) <= 10 and valor.isascii() and valor.isdigit()
+
+
+def columna_como_texto(df, columna):
+    """Columna del archivo como texto sin espacios ('' para celdas vacías o columna ausente)"""
+    if columna not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    valores = df[columna]
+    return valores.astype(str).str.strip().where(valores.notna(), '')
+
+
+def leer_csv(archivo, columnas, max_filas=None):
+    """Leer del CSV solo las columnas indicadas, como texto, hasta ``max_filas`` filas"""
+    return pd.read_csv(archivo, usecols=lambda c: c in columnas, dtype=str, nrows=max_filas)
+
+
+def leer_xlsx(archivo, columnas, max_filas=None):
+    """Leer de la primera hoja solo las columnas indicadas, hasta ``max_filas`` filas"""
+    # Modo solo lectura: openpyxl recorre la hoja por filas sin cargar el libro completo
+    libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        # Igual que pd.read_excel: siempre la primera hoja, no la que quedó seleccionada al guardar
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezado = next(filas, ())
+        indices = [i for i, nombre in enumerate(encabezado) if nombre in columnas]
+        datos = [
+            [fila[i] if i < len(fila) else None for i in indices]
+            for fila in islice(filas, max_filas)
+        ]
+    finally:
+        libro.close()
+
+    # Igual que pd.read_excel: descartar filas vacías al final de la hoja
+    while datos and all(valor is None for valor in datos[-1]):
+        datos.pop()
+    return pd.DataFrame(datos, columns=[encabezado[i] for i in indices], dtype=object)
+
+
+def leer_archivo_importacion(archivo, columnas, max_filas=None):
+    """
+    Leer del CSV/Excel solo las columnas indicadas, como texto y sin pasar de ``max_filas``.
+
+    Retorna None si el formato no es soportado. Quien tiene un límite de filas pide una
+    más para poder rechazar el archivo sin cargarlo completo.
+    """
+    if archivo.name.endswith('.csv'):
+        return leer_csv(archivo, columnas, max_filas)
+    if archivo.name.endswith('.xlsx'):
+        return leer_xlsx(archivo, columnas, max_filas)
+    return None
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-15 22:41
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('almacenes', '0012_alter_inspeccionlaboratorio_comentarios_adicionales_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='lote',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('numero_lote'), name='gin_trgm_ops'), name='lote_numero_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('codigo_requerimiento_compra'), name='gin_trgm_ops'), name='lote_cod_req_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='lote',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('codigo_nota_ingreso'), name='gin_trgm_ops'), name='lote_cod_nota_trgm'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-15 22:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('almacenes', '0013_lote_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['lote', 'modelo', 'estado_onu'], name='material_lote_modelo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['lote', 'tipo_material', 'es_nuevo', 'estado_onu'], name='material_lote_tipo_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-15 22:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('almacenes', '0014_material_lote_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='material',
+            name='serial_manufacturer',
+            field=models.CharField(blank=True, db_index=True, help_text='D-SN/Serial Manufacturer para equipos únicos (opcional)', max_length=100, null=True),
+        ),
+    ]
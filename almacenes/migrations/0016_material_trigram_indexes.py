@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-15 23:14
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('almacenes', '0015_material_serial_manufacturer_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='material',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('codigo_interno'), name='gin_trgm_ops'), name='material_codigo_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('mac_address'), name='gin_trgm_ops'), name='material_mac_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('gpon_serial'), name='gin_trgm_ops'), name='material_gpon_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('serial_manufacturer'), name='gin_trgm_ops'), name='material_dsn_trgm'),
+        ),
+    ]
@@ -4,11 +4,15 @@
 # ======================================================
 
 from django.db import models
+from django.db.models.functions import Coalesce, Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 import re
 
+from .cache import obtener_por_codigo, invalidar_cache_lote
+
 
 # ========== MODELOS BASE PARA CHOICES ==========
 
@@ -565,6 +569,12 @@ class Lote(models.Model):
         db_table = 'almacenes_lote'
         verbose_name = 'Lote'
         verbose_name_plural = 'Lotes'
+        indexes = [
+            # Trigramas sobre UPPER(...) para las búsquedas icontains de SearchFilter
+            GinIndex(OpClass(Upper('numero_lote'), name='gin_trgm_ops'), name='lote_numero_trgm'),
+            GinIndex(OpClass(Upper('codigo_requerimiento_compra'), name='gin_trgm_ops'), name='lote_cod_req_trgm'),
+            GinIndex(OpClass(Upper('codigo_nota_ingreso'), name='gin_trgm_ops'), name='lote_cod_nota_trgm'),
+        ]
 
     def __str__(self):
         return f"{self.numero_lote} - {self.proveedor.nombre_comercial}"
@@ -577,10 +587,17 @@ class Lote(models.Model):
 
     @property
     def cantidad_total(self):
+        # Usar la anotación de anotar_cantidades si el queryset la trae
+        anotada = getattr(self, 'cantidad_total_anotada', None)
+        if anotada is not None:
+            return anotada
         return sum(detalle.cantidad for detalle in self.detalles.all())
 
     @property
     def cantidad_recibida(self):
+        anotada = getattr(self, 'cantidad_recibida_anotada', None)
+        if anotada is not None:
+            return anotada
         return self.material_set.count()
 
     @property
@@ -594,6 +611,35 @@ class Lote(models.Model):
             return 0
         return round((self.cantidad_recibida / total) * 100, 2)
 
+    @classmethod
+    def anotar_cantidades(cls, queryset):
+        """Anotar cantidad total y recibida con subconsultas correlacionadas (sin JOIN que duplique filas)"""
+        total_detalles = LoteDetalle.objects.filter(lote=models.OuterRef('pk')).order_by().values(
+            'lote').annotate(total=models.Sum('cantidad')).values('total')
+        total_materiales = Material.objects.filter(lote=models.OuterRef('pk')).order_by().values(
+            'lote').annotate(total=models.Count('id')).values('total')
+
+        return queryset.annotate(
+            cantidad_total_anotada=Coalesce(models.Subquery(total_detalles), 0),
+            cantidad_recibida_anotada=Coalesce(models.Subquery(total_materiales), 0),
+        )
+
+    @classmethod
+    def calcular_estadisticas(cls, pk):
+        """Cantidades del lote calculadas en una sola consulta"""
+        datos = cls.anotar_cantidades(cls.objects.filter(pk=pk)).values(
+            'cantidad_total_anotada', 'cantidad_recibida_anotada'
+        ).first() or {'cantidad_total_anotada': 0, 'cantidad_recibida_anotada': 0}
+
+        cantidad_total = datos['cantidad_total_anotada']
+        cantidad_recibida = datos['cantidad_recibida_anotada']
+        return {
+            'cantidad_total': cantidad_total,
+            'cantidad_recibida': cantidad_recibida,
+            'cantidad_pendiente': max(0, cantidad_total - cantidad_recibida),
+            'porcentaje_recibido': round((cantidad_recibida / cantidad_total) * 100, 2) if cantidad_total else 0,
+        }
+
 
 class EntregaParcialLote(models.Model):
     """Modelo para control de entregas parciales de lotes"""
@@ -680,6 +726,7 @@ class Material(models.Model):
         max_length=100,
         blank=True,  # Permitir vacío en formularios
         null=True,  # Permitir NULL en base de datos
+        db_index=True,
         help_text="D-SN/Serial Manufacturer para equipos únicos (opcional)"
     )
 
@@ -802,6 +849,17 @@ class Material(models.Model):
         db_table = 'almacenes_material'
         verbose_name = 'Material'
         verbose_name_plural = 'Materiales'
+        indexes = [
+            # Resumen por modelo/estado dentro de un lote
+            models.Index(fields=['lote', 'modelo', 'estado_onu'], name='material_lote_modelo_idx'),
+            # Envío masivo a laboratorio (ONUs nuevas del lote)
+            models.Index(fields=['lote', 'tipo_material', 'es_nuevo', 'estado_onu'], name='material_lote_tipo_idx'),
+            # Trigramas sobre UPPER(...) para las búsquedas icontains (SearchFilter y busqueda_avanzada)
+            GinIndex(OpClass(Upper('codigo_interno'), name='gin_trgm_ops'), name='material_codigo_trgm'),
+            GinIndex(OpClass(Upper('mac_address'), name='gin_trgm_ops'), name='material_mac_trgm'),
+            GinIndex(OpClass(Upper('gpon_serial'), name='gin_trgm_ops'), name='material_gpon_trgm'),
+            GinIndex(OpClass(Upper('serial_manufacturer'), name='gin_trgm_ops'), name='material_dsn_trgm'),
+        ]
 
     def __str__(self):
         if self.tipo_material.es_unico:
@@ -851,13 +909,13 @@ class Material(models.Model):
             # Buscar estado por código para equipos únicos
             if self.es_nuevo:
                 try:
-                    estado_nuevo = EstadoMaterialONU.objects.get(codigo='NUEVO', activo=True)
+                    estado_nuevo = obtener_por_codigo(EstadoMaterialONU, 'NUEVO')
                     self.estado_onu = estado_nuevo
                 except EstadoMaterialONU.DoesNotExist:
                     pass
             else:
                 try:
-                    estado_reingresado = EstadoMaterialONU.objects.get(codigo='REINGRESADO', activo=True)
+                    estado_reingresado = obtener_por_codigo(EstadoMaterialONU, 'REINGRESADO')
                     self.estado_onu = estado_reingresado
                 except EstadoMaterialONU.DoesNotExist:
                     pass
@@ -865,7 +923,7 @@ class Material(models.Model):
         elif not self.tipo_material.es_unico and not self.estado_general:
             # Buscar estado por código para materiales generales
             try:
-                estado_disponible = EstadoMaterialGeneral.objects.get(codigo='DISPONIBLE', activo=True)
+                estado_disponible = obtener_por_codigo(EstadoMaterialGeneral, 'DISPONIBLE')
                 self.estado_general = estado_disponible
             except EstadoMaterialGeneral.DoesNotExist:
                 pass
@@ -885,6 +943,46 @@ class Material(models.Model):
             if not Material.objects.filter(codigo_interno=codigo).exists():
                 return codigo
 
+    @classmethod
+    def generar_codigos_internos(cls, es_unico, cantidad):
+        """Generar varios códigos internos únicos verificando colisiones en una sola consulta"""
+        import uuid
+        prefijo = "EQ" if es_unico else "MAT"
+        codigos = set()
+        while len(codigos) < cantidad:
+            candidatos = {
+                f"{prefijo}-{str(uuid.uuid4().int)[:8]}" for _ in range(cantidad - len(codigos))
+            } - codigos
+            existentes = set(
+                cls.objects.filter(codigo_interno__in=candidatos).values_list('codigo_interno', flat=True)
+            )
+            codigos |= candidatos - existentes
+        return list(codigos)
+
+    @classmethod
+    def identificadores_existentes(cls, macs, gpons, d_sns):
+        """
+        De los MAC, GPON y D-SN indicados, retornar los que ya están registrados.
+
+        Una sola consulta con OR sobre las tres columnas únicas/indexadas; retorna
+        ``(macs_existentes, gpons_existentes, dsns_existentes)`` como sets.
+        """
+        macs, gpons, d_sns = set(macs), set(gpons), set(d_sns)
+        registrados = cls.objects.filter(
+            models.Q(mac_address__in=macs) | models.Q(gpon_serial__in=gpons) |
+            models.Q(serial_manufacturer__in=d_sns)
+        ).values_list('mac_address', 'gpon_serial', 'serial_manufacturer')
+
+        macs_existentes, gpons_existentes, dsns_existentes = set(), set(), set()
+        for mac, gpon, d_sn in registrados:
+            if mac in macs:
+                macs_existentes.add(mac)
+            if gpon in gpons:
+                gpons_existentes.add(gpon)
+            if d_sn in d_sns:
+                dsns_existentes.add(d_sn)
+        return macs_existentes, gpons_existentes, dsns_existentes
+
     @property
     def estado_display(self):
         """Obtener estado para mostrar según el tipo de material"""
@@ -921,7 +1019,7 @@ class Material(models.Model):
         """Enviar material a laboratorio"""
         if self.tipo_material.es_unico:
             try:
-                estado_laboratorio = EstadoMaterialONU.objects.get(codigo='EN_LABORATORIO', activo=True)
+                estado_laboratorio = obtener_por_codigo(EstadoMaterialONU, 'EN_LABORATORIO')
                 self.estado_onu = estado_laboratorio
             except EstadoMaterialONU.DoesNotExist:
                 pass
@@ -929,6 +1027,29 @@ class Material(models.Model):
         self.fecha_envio_laboratorio = timezone.now()
         self.save()
 
+    @classmethod
+    def enviar_a_laboratorio_masivo(cls, materiales):
+        """
+        Enviar a laboratorio los materiales únicos de un queryset con un solo UPDATE.
+
+        Las filas no únicas del queryset se ignoran. Para las únicas es la misma transición
+        que ``enviar_a_laboratorio``; como update() no emite señales, invalida aquí la caché
+        de los lotes afectados. Retorna la cantidad actualizada.
+        """
+        materiales = materiales.filter(tipo_material__es_unico=True)
+        ahora = timezone.now()
+        campos = {'fecha_envio_laboratorio': ahora, 'updated_at': ahora}
+        try:
+            campos['estado_onu'] = obtener_por_codigo(EstadoMaterialONU, 'EN_LABORATORIO')
+        except EstadoMaterialONU.DoesNotExist:
+            pass
+
+        lote_ids = set(materiales.order_by().values_list('lote_id', flat=True).distinct())
+        cantidad = materiales.update(**campos)
+        for lote_id in lote_ids:
+            invalidar_cache_lote(lote_id)
+        return cantidad
+
     def retornar_de_laboratorio(self, resultado_exitoso=True, informe_numero=None, detalles=None):
         """Retornar material de laboratorio"""
         self.fecha_retorno_laboratorio = timezone.now()
@@ -936,13 +1057,13 @@ class Material(models.Model):
         if self.tipo_material.es_unico:
             if resultado_exitoso:
                 try:
-                    estado_disponible = EstadoMaterialONU.objects.get(codigo='DISPONIBLE', activo=True)
+                    estado_disponible = obtener_por_codigo(EstadoMaterialONU, 'DISPONIBLE')
                     self.estado_onu = estado_disponible
                 except EstadoMaterialONU.DoesNotExist:
                     pass
             else:
                 try:
-                    estado_defectuoso = EstadoMaterialONU.objects.get(codigo='DEFECTUOSO', activo=True)
+                    estado_defectuoso = obtener_por_codigo(EstadoMaterialONU, 'DEFECTUOSO')
                     self.estado_onu = estado_defectuoso
                 except EstadoMaterialONU.DoesNotExist:
                     pass
@@ -1029,7 +1150,7 @@ class TraspasoAlmacen(models.Model):
         # Asignar estado inicial si no tiene
         if not self.estado_id:
             try:
-                estado_pendiente = EstadoTraspaso.objects.get(codigo='PENDIENTE', activo=True)
+                estado_pendiente = obtener_por_codigo(EstadoTraspaso, 'PENDIENTE')
                 self.estado = estado_pendiente
             except EstadoTraspaso.DoesNotExist:
                 pass
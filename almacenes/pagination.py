@@ -1,5 +1,5 @@
 # almacenes/pagination.py
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 
 
@@ -17,4 +17,12 @@ class CustomPageNumberPagination(PageNumberPagination):
             'current_page': self.page.number,
             'total_pages': self.page.paginator.num_pages,
             'page_size': self.page_size
-        })
\ No newline at end of file
+        })
+
+
+class MaterialCursorPagination(CursorPagination):
+    """Paginación por cursor (keyset) para listados largos de materiales: sin COUNT ni OFFSET"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = '-id'
@@ -6,12 +6,12 @@
 from django.db import transaction
 from rest_framework import serializers
 from decimal import Decimal
-import pandas as pd
-import re
 from io import BytesIO
 from django.utils import timezone
 
 from usuarios.models import Usuario
+from .cache import obtener_por_codigo
+from .importacion import leer_csv, leer_xlsx, columna_como_texto, PATRON_MAC, TAMANO_MAXIMO_ARCHIVO
 from .models import (
     # Modelos base
     Almacen, Proveedor,
@@ -531,7 +531,7 @@ class LoteCreateSerializer(serializers.ModelSerializer):
         with transaction.atomic():
             # Asignar estado inicial al lote
             try:
-                estado_registrado = EstadoLote.objects.get(codigo='REGISTRADO', activo=True)
+                estado_registrado = obtener_por_codigo(EstadoLote, 'REGISTRADO')
                 validated_data['estado'] = estado_registrado
             except EstadoLote.DoesNotExist:
                 pass
@@ -671,7 +671,7 @@ class MaterialSerializer(serializers.ModelSerializer):
         """Validar MAC Address con formato mantenido"""
         if value:
             value = value.upper().replace('-', ':')
-            if not re.match(r'^([0-9A-F]{2}[:-]){5}([0-9A-F]{2})$', value):
+            if not PATRON_MAC.match(value):
                 raise serializers.ValidationError("Formato de MAC inválido. Use XX:XX:XX:XX:XX:XX")
         return value
 
@@ -937,7 +937,7 @@ class TraspasoCreateSerializer(serializers.ModelSerializer):
         with transaction.atomic():
             # Buscar estado inicial
             try:
-                estado_pendiente = EstadoTraspaso.objects.get(codigo='PENDIENTE', activo=True)
+                estado_pendiente = obtener_por_codigo(EstadoTraspaso, 'PENDIENTE')
                 validated_data['estado'] = estado_pendiente
             except EstadoTraspaso.DoesNotExist:
                 pass
@@ -1175,7 +1175,7 @@ class ImportacionMasivaSerializer(serializers.Serializer):
     def validate_archivo(self, value):
         """Validar archivo subido"""
         # Verificar tamaño (máximo 5MB)
-        if value.size > 5 * 1024 * 1024:
+        if value.size > TAMANO_MAXIMO_ARCHIVO:
             raise serializers.ValidationError("El archivo no puede ser mayor a 5MB")
 
         # Verificar extensión
@@ -1192,7 +1192,7 @@ class ImportacionMasivaSerializer(serializers.Serializer):
 
             # Verificar que el lote no esté cerrado
             try:
-                estado_cerrado = EstadoLote.objects.get(codigo='CERRADO', activo=True)
+                estado_cerrado = obtener_por_codigo(EstadoLote, 'CERRADO')
                 if lote.estado == estado_cerrado:
                     raise serializers.ValidationError("No se puede importar a un lote cerrado")
             except EstadoLote.DoesNotExist:
@@ -1222,19 +1222,18 @@ class ImportacionMasivaSerializer(serializers.Serializer):
         modelo_id = self.validated_data['modelo_id']
         validar_solo = self.validated_data['validar_solo']
 
-        # Leer archivo según extensión
+        columnas_requeridas = ['MAC', 'GPON_SN', 'D_SN', 'ITEM_EQUIPO']
+
+        # Leer archivo según extensión (solo las columnas usadas, como texto)
         try:
             if archivo.name.lower().endswith('.xlsx'):
-                df = pd.read_excel(archivo)
+                df = leer_xlsx(archivo, columnas_requeridas)
             else:  # CSV
-                df = pd.read_csv(archivo)
+                df = leer_csv(archivo, columnas_requeridas)
         except Exception as e:
             raise serializers.ValidationError(f"Error leyendo archivo: {str(e)}")
 
         # Validar columnas requeridas
-        columnas_requeridas = ['MAC', 'GPON_SN', 'D_SN', 'ITEM_EQUIPO']
-        # Validar columnas requeridas
-        columnas_requeridas = ['MAC', 'GPON_SN', 'D_SN', 'ITEM_EQUIPO']
         columnas_faltantes = [col for col in columnas_requeridas if col not in df.columns]
 
         if columnas_faltantes:
@@ -1256,17 +1255,29 @@ class ImportacionMasivaSerializer(serializers.Serializer):
 
         equipos_validos = []
 
+        # Extraer y limpiar datos por columna (sin iterrows)
+        macs = columna_como_texto(df, 'MAC').str.upper()
+        gpons = columna_como_texto(df, 'GPON_SN')
+        d_sns = columna_como_texto(df, 'D_SN')
+        items = columna_como_texto(df, 'ITEM_EQUIPO')
+        macs_con_formato = macs.str.match(PATRON_MAC)
+
+        # Valores ya registrados: una sola consulta en lugar de exists() por fila.
+        # Sin celdas vacías ni MACs con formato inválido: un '' traería todo lo que tenga ese campo vacío
+        macs_existentes, gpons_existentes, dsns_existentes = Material.identificadores_existentes(
+            macs[macs_con_formato].str.replace('-', ':', regex=False), gpons[gpons != ''], d_sns[d_sns != '']
+        )
+
+        # Valores ya vistos en el archivo (una sola pasada con sets)
+        macs_vistas, gpons_vistos, dsns_vistos = set(), set(), set()
+
         # ✅ VERSIÓN CORREGIDA COMPLETA
-        for index, row in df.iterrows():
+        for index, mac, gpon_sn, d_sn, item_equipo, mac_con_formato in zip(
+            df.index, macs, gpons, d_sns, items, macs_con_formato
+        ):
             fila_num = index + 2  # +2 porque pandas es 0-indexed y hay header
             errores_fila = []
 
-            # Extraer y limpiar datos
-            mac = str(row['MAC']).strip().upper() if pd.notna(row['MAC']) else ''
-            gpon_sn = str(row['GPON_SN']).strip() if pd.notna(row['GPON_SN']) else ''
-            d_sn = str(row['D_SN']).strip() if pd.notna(row['D_SN']) else ''
-            item_equipo = str(row['ITEM_EQUIPO']).strip() if pd.notna(row['ITEM_EQUIPO']) else ''
-
             # Validar campos requeridos
             if not mac:
                 errores_fila.append("MAC Address requerido")
@@ -1278,7 +1289,7 @@ class ImportacionMasivaSerializer(serializers.Serializer):
                 errores_fila.append("Item Equipo requerido")
 
             # Validar formato MAC
-            if mac and not re.match(r'^([0-9A-F]{2}[:-]){5}([0-9A-F]{2})$', mac):
+            if mac and not mac_con_formato:
                 errores_fila.append("Formato de MAC inválido")
             else:
                 # Normalizar MAC
@@ -1289,18 +1300,27 @@ class ImportacionMasivaSerializer(serializers.Serializer):
             if item_equipo and (not item_equipo.isdigit() or not (6 <= len(item_equipo) <= 10)):
                 errores_fila.append("Item Equipo debe tener 6-10 dígitos")
 
-            # Validar unicidad
+            # Validar unicidad (en el archivo y en el sistema)
             if mac:
-                if Material.objects.filter(mac_address=mac).exists():
+                if mac in macs_vistas:
+                    errores_fila.append(f"MAC {mac} duplicada en el archivo")
+                elif mac in macs_existentes:
                     errores_fila.append(f"MAC {mac} ya existe en el sistema")
+                macs_vistas.add(mac)
 
             if gpon_sn:
-                if Material.objects.filter(gpon_serial=gpon_sn).exists():
+                if gpon_sn in gpons_vistos:
+                    errores_fila.append(f"GPON Serial {gpon_sn} duplicado en el archivo")
+                elif gpon_sn in gpons_existentes:
                     errores_fila.append(f"GPON Serial {gpon_sn} ya existe")
+                gpons_vistos.add(gpon_sn)
 
             if d_sn:
-                if Material.objects.filter(serial_manufacturer=d_sn).exists():
+                if d_sn in dsns_vistos:
+                    errores_fila.append(f"D-SN {d_sn} duplicado en el archivo")
+                elif d_sn in dsns_existentes:
                     errores_fila.append(f"D-SN {d_sn} ya existe")
+                dsns_vistos.add(d_sn)
 
             # Registrar resultados
             if errores_fila:
@@ -1334,35 +1354,42 @@ class ImportacionMasivaSerializer(serializers.Serializer):
         # Proceder con la importación
         try:
             # Obtener estados necesarios
-            tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
-            estado_nuevo = EstadoMaterialONU.objects.get(codigo='NUEVO', activo=True)
-            tipo_nuevo = TipoIngreso.objects.get(codigo='NUEVO', activo=True)
+            tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
+            estado_nuevo = obtener_por_codigo(EstadoMaterialONU, 'NUEVO')
+            tipo_nuevo = obtener_por_codigo(TipoIngreso, 'NUEVO')
+
+            codigos_internos = Material.generar_codigos_internos(True, len(equipos_validos))
+            materiales = [
+                Material(
+                    codigo_interno=codigo_interno,
+                    tipo_material=tipo_onu,
+                    modelo=modelo,
+                    lote=lote,
+                    mac_address=equipo_data['mac_address'],
+                    gpon_serial=equipo_data['gpon_serial'],
+                    serial_manufacturer=equipo_data['serial_manufacturer'],
+                    codigo_item_equipo=equipo_data['codigo_item_equipo'],
+                    almacen_actual=lote.almacen_destino,
+                    estado_onu=estado_nuevo,
+                    es_nuevo=True,
+                    tipo_origen=tipo_nuevo,
+                    cantidad=1.00
+                )
+                for equipo_data, codigo_interno in zip(equipos_validos, codigos_internos)
+            ]
 
             with transaction.atomic():
-                for equipo_data in equipos_validos:
-                    material = Material.objects.create(
-                        tipo_material=tipo_onu,
-                        modelo=modelo,
-                        lote=lote,
-                        mac_address=equipo_data['mac_address'],
-                        gpon_serial=equipo_data['gpon_serial'],
-                        serial_manufacturer=equipo_data['serial_manufacturer'],
-                        codigo_item_equipo=equipo_data['codigo_item_equipo'],
-                        almacen_actual=lote.almacen_destino,
-                        estado_onu=estado_nuevo,
-                        es_nuevo=True,
-                        tipo_origen=tipo_nuevo,
-                        cantidad=1.00
-                    )
-                    resultados['importados'] += 1
+                # Un INSERT por cada 500 equipos en lugar de uno por fila
+                Material.objects.bulk_create(materiales, batch_size=500)
+                resultados['importados'] = len(materiales)
 
                 # Actualizar estado del lote si es necesario
                 try:
                     if lote.cantidad_recibida >= lote.cantidad_total:
-                        estado_completa = EstadoLote.objects.get(codigo='RECEPCION_COMPLETA', activo=True)
+                        estado_completa = obtener_por_codigo(EstadoLote, 'RECEPCION_COMPLETA')
                         lote.estado = estado_completa
                     else:
-                        estado_parcial = EstadoLote.objects.get(codigo='RECEPCION_PARCIAL', activo=True)
+                        estado_parcial = obtener_por_codigo(EstadoLote, 'RECEPCION_PARCIAL')
                         lote.estado = estado_parcial
                     lote.save()
                 except EstadoLote.DoesNotExist:
@@ -1458,7 +1485,9 @@ class MaterialDetailSerializer(MaterialListSerializer):
 
     def get_historial(self, obj):
         # Obtener historial reciente
-        historial = obj.historial.all()[:10]
+        historial = obj.historial.select_related(
+            'almacen_anterior', 'almacen_nuevo', 'usuario_responsable'
+        )[:10]
         return [{
             'id': h.id,
             'fecha_cambio': h.fecha_cambio,
@@ -1659,21 +1688,22 @@ class DevolucionSectorSerializer(serializers.Serializer):
         if not value:
             raise serializers.ValidationError("Debe seleccionar al menos un material")
 
-        # Verificar que estén defectuosos
-        estado_defectuoso = EstadoMaterialONU.objects.get(codigo='DEFECTUOSO', activo=True)
-        materiales = Material.objects.filter(id__in=value)
+        # Verificar que estén defectuosos (solo se trae el código del primero que no lo esté)
+        estado_defectuoso = obtener_por_codigo(EstadoMaterialONU, 'DEFECTUOSO')
+        codigo_invalido = Material.objects.filter(id__in=value).exclude(
+            estado_onu_id=estado_defectuoso.pk
+        ).values_list('codigo_interno', flat=True).first()
 
-        for material in materiales:
-            if material.estado_onu != estado_defectuoso:
-                raise serializers.ValidationError(
-                    f"Material {material.codigo_interno} debe estar DEFECTUOSO"
-                )
+        if codigo_invalido is not None:
+            raise serializers.ValidationError(
+                f"Material {codigo_invalido} debe estar DEFECTUOSO"
+            )
 
         return value
 
     def ejecutar(self, user):
         """Cambiar estado a DEVUELTO_SECTOR_SOLICITANTE"""
-        estado_devuelto = EstadoMaterialONU.objects.get(codigo='DEVUELTO_SECTOR_SOLICITANTE', activo=True)
+        estado_devuelto = obtener_por_codigo(EstadoMaterialONU, 'DEVUELTO_SECTOR_SOLICITANTE')
         materiales = Material.objects.filter(id__in=self.validated_data['materiales_ids'])
         motivo = self.validated_data['motivo']
 
@@ -1713,18 +1743,25 @@ class ReingresoSectorSerializer(serializers.Serializer):
     )
 
     def validate_materiales_originales_ids(self, value):
-        estado_devuelto = EstadoMaterialONU.objects.get(codigo='DEVUELTO_SECTOR_SOLICITANTE', activo=True)
-        materiales = Material.objects.filter(id__in=value)
+        estado_devuelto = obtener_por_codigo(EstadoMaterialONU, 'DEVUELTO_SECTOR_SOLICITANTE')
+        codigo_invalido = Material.objects.filter(id__in=value).exclude(
+            estado_onu_id=estado_devuelto.pk
+        ).values_list('codigo_interno', flat=True).first()
 
-        for material in materiales:
-            if material.estado_onu != estado_devuelto:
-                raise serializers.ValidationError(
-                    f"Material {material.codigo_interno} debe estar DEVUELTO_SECTOR_SOLICITANTE"
-                )
+        if codigo_invalido is not None:
+            raise serializers.ValidationError(
+                f"Material {codigo_invalido} debe estar DEVUELTO_SECTOR_SOLICITANTE"
+            )
 
         return value
 
     def validate_nuevos_equipos(self, value):
+        # Una sola consulta para las MAC que ya existen, en lugar de un exists() por equipo
+        macs = [equipo['mac_address'].upper().replace('-', ':') for equipo in value if equipo.get('mac_address')]
+        macs_existentes = set(
+            Material.objects.filter(mac_address__in=macs).values_list('mac_address', flat=True)
+        )
+
         for i, equipo in enumerate(value):
             # Validar campos requeridos
             if not equipo.get('mac_address'):
@@ -1736,22 +1773,22 @@ class ReingresoSectorSerializer(serializers.Serializer):
 
             # Validar formatos
             mac = equipo['mac_address'].upper().replace('-', ':')
-            if not re.match(r'^([0-9A-F]{2}[:-]){5}([0-9A-F]{2})$', mac):
+            if not PATRON_MAC.match(mac):
                 raise serializers.ValidationError(f"Equipo {i + 1}: MAC inválido")
 
             # Verificar unicidad
-            if Material.objects.filter(mac_address=mac).exists():
+            if mac in macs_existentes:
                 raise serializers.ValidationError(f"MAC {mac} ya existe")
 
         return value
 
     def ejecutar(self, user):
         """Crear nuevos materiales de reingreso y marcar originales como REEMPLAZADO"""
-        estado_nuevo = EstadoMaterialONU.objects.get(codigo='NUEVO', activo=True)
-        estado_reemplazado = EstadoMaterialONU.objects.get(codigo='REEMPLAZADO', activo=True)  # Cambio aquí
+        estado_nuevo = obtener_por_codigo(EstadoMaterialONU, 'NUEVO')
+        estado_reemplazado = obtener_por_codigo(EstadoMaterialONU, 'REEMPLAZADO')  # Cambio aquí
 
-        tipo_reingreso = TipoIngreso.objects.get(codigo='REINGRESO', activo=True)
-        tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
+        tipo_reingreso = obtener_por_codigo(TipoIngreso, 'REINGRESO')
+        tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
 
         materiales_originales = Material.objects.filter(
             id__in=self.validated_data['materiales_originales_ids']
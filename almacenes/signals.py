@@ -0,0 +1,31 @@
+# ======================================================
+# almacenes/signals.py
+# Señales para mantener consistentes las cachés del módulo
+#
+# La invalidación llega a todos los procesos solo con una caché compartida (Redis,
+# DatabaseCache); con la LocMemCache por defecto afecta únicamente al proceso que
+# guardó, y el resto depende del TTL (ver cache.py).
+# ======================================================
+from django.db.models.signals import post_save, post_delete
+
+from .cache import limpiar_cache_codigos, limpiar_cache_lote
+from .models import (
+    TipoIngreso, EstadoLote, TipoMaterial, EstadoMaterialONU, EstadoMaterialGeneral, EstadoTraspaso,
+    Lote, LoteDetalle, EntregaParcialLote, Material
+)
+
+MODELOS_CON_CODIGO = (
+    TipoIngreso, EstadoLote, TipoMaterial, EstadoMaterialONU, EstadoMaterialGeneral, EstadoTraspaso
+)
+
+for _modelo in MODELOS_CON_CODIGO:
+    post_save.connect(limpiar_cache_codigos, sender=_modelo, dispatch_uid=f'limpiar_codigos_save_{_modelo.__name__}')
+    post_delete.connect(limpiar_cache_codigos, sender=_modelo, dispatch_uid=f'limpiar_codigos_delete_{_modelo.__name__}')
+
+# Modelos que alteran el resumen y las estadísticas cacheadas de lotes.
+# Las operaciones masivas (update/bulk_create) no emiten señales y llaman a invalidar_cache_lote.
+MODELOS_DE_LOTE = (Lote, LoteDetalle, EntregaParcialLote, Material)
+
+for _modelo in MODELOS_DE_LOTE:
+    post_save.connect(limpiar_cache_lote, sender=_modelo, dispatch_uid=f'limpiar_lote_save_{_modelo.__name__}')
+    post_delete.connect(limpiar_cache_lote, sender=_modelo, dispatch_uid=f'limpiar_lote_delete_{_modelo.__name__}')
@@ -1,3 +1,28 @@
-from django.test import TestCase
+from io import BytesIO
 
-# Create your tests here.
+import openpyxl
+from django.test import SimpleTestCase
+
+from .importacion import leer_xlsx
+
+
+class LeerXlsxTests(SimpleTestCase):
+
+    def test_lee_la_primera_hoja_aunque_otra_este_activa(self):
+        libro = openpyxl.Workbook()
+        primera = libro.active
+        primera.append(['MAC', 'GPON_SN', 'OTRA'])
+        primera.append(['00:11:22:33:44:55', 'HWTC00000001', 'x'])
+        segunda = libro.create_sheet('Notas')
+        segunda.append(['COMENTARIO'])
+        segunda.append(['no importar'])
+        libro.active = 1
+
+        archivo = BytesIO()
+        libro.save(archivo)
+        archivo.seek(0)
+
+        df = leer_xlsx(archivo, ['MAC', 'GPON_SN'])
+
+        self.assertEqual(list(df.columns), ['MAC', 'GPON_SN'])
+        self.assertEqual(df.values.tolist(), [['00:11:22:33:44:55', 'HWTC00000001']])
@@ -17,6 +17,7 @@ from ..models import (
     # Modelos de choices (antes TextChoices)
     TipoMaterial, EstadoMaterialONU, TipoIngreso, EstadoLote, HistorialMaterial, InspeccionLaboratorio
 )
+from ..cache import obtener_por_codigo
 from ..serializers import (
     LaboratorioOperacionSerializer, MaterialListSerializer, InspeccionLaboratorioSerializer
 )
@@ -31,12 +32,12 @@ class LaboratorioView(APIView):
 
         try:
             # Obtener estados y tipos necesarios
-            tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
-            estado_laboratorio = EstadoMaterialONU.objects.get(codigo='EN_LABORATORIO', activo=True)
-            estado_nuevo = EstadoMaterialONU.objects.get(codigo='NUEVO', activo=True)
-            tipo_nuevo = TipoIngreso.objects.get(codigo='NUEVO', activo=True)
-            estado_disponible = EstadoMaterialONU.objects.get(codigo='DISPONIBLE', activo=True)
-            estado_defectuoso = EstadoMaterialONU.objects.get(codigo='DEFECTUOSO', activo=True)
+            tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
+            estado_laboratorio = obtener_por_codigo(EstadoMaterialONU, 'EN_LABORATORIO')
+            estado_nuevo = obtener_por_codigo(EstadoMaterialONU, 'NUEVO')
+            tipo_nuevo = obtener_por_codigo(TipoIngreso, 'NUEVO')
+            estado_disponible = obtener_por_codigo(EstadoMaterialONU, 'DISPONIBLE')
+            estado_defectuoso = obtener_por_codigo(EstadoMaterialONU, 'DEFECTUOSO')
         except (TipoMaterial.DoesNotExist, EstadoMaterialONU.DoesNotExist, TipoIngreso.DoesNotExist):
             return Response(
                 {'error': 'Configuración de estados de laboratorio incompleta'},
@@ -163,9 +164,9 @@ class LaboratorioMasivoView(APIView):
 
         try:
             lote = Lote.objects.get(id=lote_id)
-            tipo_nuevo = TipoIngreso.objects.get(codigo='NUEVO', activo=True)
-            tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
-            estado_nuevo = EstadoMaterialONU.objects.get(codigo='NUEVO', activo=True)
+            tipo_nuevo = obtener_por_codigo(TipoIngreso, 'NUEVO')
+            tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
+            estado_nuevo = obtener_por_codigo(EstadoMaterialONU, 'NUEVO')
         except (Lote.DoesNotExist, TipoIngreso.DoesNotExist, TipoMaterial.DoesNotExist, EstadoMaterialONU.DoesNotExist):
             return Response(
                 {'error': 'Lote no encontrado o configuración incompleta'},
@@ -186,18 +187,15 @@ class LaboratorioMasivoView(APIView):
             estado_onu=estado_nuevo
         )
 
-        if not materiales_nuevos.exists():
+        with transaction.atomic():
+            count = Material.enviar_a_laboratorio_masivo(materiales_nuevos)
+
+        if not count:
             return Response(
                 {'message': 'No hay materiales nuevos en este lote que requieran laboratorio'},
                 status=status.HTTP_200_OK
             )
 
-        with transaction.atomic():
-            count = 0
-            for material in materiales_nuevos:
-                material.enviar_a_laboratorio(usuario=request.user)
-                count += 1
-
         return Response({
             'success': True,
             'message': f'{count} materiales del lote {lote.numero_lote} enviados a laboratorio',
@@ -225,8 +223,8 @@ class LaboratorioMasivoView(APIView):
             )
 
         try:
-            tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
-            estado_laboratorio = EstadoMaterialONU.objects.get(codigo='EN_LABORATORIO', activo=True)
+            tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
+            estado_laboratorio = obtener_por_codigo(EstadoMaterialONU, 'EN_LABORATORIO')
         except (TipoMaterial.DoesNotExist, EstadoMaterialONU.DoesNotExist):
             return Response(
                 {'error': 'Configuración de laboratorio incompleta'},
@@ -239,17 +237,13 @@ class LaboratorioMasivoView(APIView):
             estado_onu=estado_laboratorio
         )
 
-        if not materiales.exists():
-            return Response(
-                {'error': 'No se encontraron materiales válidos en laboratorio'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
         with transaction.atomic():
             count_exitosos = 0
             count_defectuosos = 0
 
-            for material in materiales:
+            # retornar_de_laboratorio guarda fila por fila: se recorre por bloques con el tipo ya unido.
+            # Sin exists() previo: si no se procesó ninguno, la consulta no encontró materiales válidos
+            for material in materiales.select_related('tipo_material').iterator(chunk_size=500):
                 material.retornar_de_laboratorio(
                     resultado_exitoso=resultado_exitoso,
                     informe_numero=numero_informe,
@@ -261,6 +255,12 @@ class LaboratorioMasivoView(APIView):
                 else:
                     count_defectuosos += 1
 
+        if not count_exitosos + count_defectuosos:
+            return Response(
+                {'error': 'No se encontraron materiales válidos en laboratorio'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         return Response({
             'success': True,
             'message': f'Retorno masivo completado - Informe: {numero_informe}',
@@ -276,8 +276,8 @@ class LaboratorioMasivoView(APIView):
         """Enviar todos los materiales pendientes de inspección inicial"""
 
         try:
-            tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
-            estado_nuevo = EstadoMaterialONU.objects.get(codigo='NUEVO', activo=True)
+            tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
+            estado_nuevo = obtener_por_codigo(EstadoMaterialONU, 'NUEVO')
         except (TipoMaterial.DoesNotExist, EstadoMaterialONU.DoesNotExist):
             return Response(
                 {'error': 'Configuración de laboratorio incompleta'},
@@ -290,18 +290,15 @@ class LaboratorioMasivoView(APIView):
             estado_onu=estado_nuevo
         )
 
-        if not materiales_pendientes.exists():
+        with transaction.atomic():
+            count = Material.enviar_a_laboratorio_masivo(materiales_pendientes)
+
+        if not count:
             return Response(
                 {'message': 'No hay materiales pendientes de inspección inicial'},
                 status=status.HTTP_200_OK
             )
 
-        with transaction.atomic():
-            count = 0
-            for material in materiales_pendientes:
-                material.enviar_a_laboratorio(usuario=request.user)
-                count += 1
-
         return Response({
             'success': True,
             'message': f'{count} materiales enviados para inspección inicial',
@@ -327,8 +324,8 @@ class LaboratorioMasivoView(APIView):
 
         try:
             lote = Lote.objects.get(id=lote_id)
-            tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
-            estado_nuevo = EstadoMaterialONU.objects.get(codigo='NUEVO', activo=True)
+            tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
+            estado_nuevo = obtener_por_codigo(EstadoMaterialONU, 'NUEVO')
         except (Lote.DoesNotExist, TipoMaterial.DoesNotExist, EstadoMaterialONU.DoesNotExist):
             return Response(
                 {'error': 'Lote no encontrado o configuración incompleta'},
@@ -344,18 +341,15 @@ class LaboratorioMasivoView(APIView):
             numero_entrega_parcial=numero_entrega
         )
 
-        if not materiales_entrega.exists():
+        with transaction.atomic():
+            count = Material.enviar_a_laboratorio_masivo(materiales_entrega)
+
+        if not count:
             return Response(
                 {'message': f'No hay materiales nuevos en la entrega #{numero_entrega} del lote {lote.numero_lote}'},
                 status=status.HTTP_200_OK
             )
 
-        with transaction.atomic():
-            count = 0
-            for material in materiales_entrega:
-                material.enviar_a_laboratorio(usuario=request.user)
-                count += 1
-
         # Descripción de la entrega
         descripcion_entrega = f'Entrega #{numero_entrega}' if numero_entrega > 0 else 'Recepción inicial'
 
@@ -394,8 +388,8 @@ class LaboratorioConsultaView(APIView):
         """Materiales actualmente en laboratorio"""
 
         try:
-            tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
-            estado_laboratorio = EstadoMaterialONU.objects.get(codigo='EN_LABORATORIO', activo=True)
+            tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
+            estado_laboratorio = obtener_por_codigo(EstadoMaterialONU, 'EN_LABORATORIO')
         except (TipoMaterial.DoesNotExist, EstadoMaterialONU.DoesNotExist):
             return Response(
                 {'error': 'Configuración de estados de laboratorio incompleta'},
@@ -434,8 +428,8 @@ class LaboratorioConsultaView(APIView):
         """Materiales nuevos pendientes de inspección inicial"""
 
         try:
-            tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
-            estado_nuevo = EstadoMaterialONU.objects.get(codigo='NUEVO', activo=True)
+            tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
+            estado_nuevo = obtener_por_codigo(EstadoMaterialONU, 'NUEVO')
         except (TipoMaterial.DoesNotExist, EstadoMaterialONU.DoesNotExist):
             return Response(
                 {'error': 'Configuración de laboratorio incompleta'},
@@ -459,17 +453,6 @@ class LaboratorioConsultaView(APIView):
             'lote__entregas_parciales'
         ).order_by('lote__numero_lote', 'numero_entrega_parcial')
 
-        # 🔍 DEBUG TEMPORAL
-        print("🔍 === DEBUG LABORATORIO PENDIENTES ===")
-        print(f"🔍 Total materiales encontrados: {materiales.count()}")
-        if materiales.exists():
-            primer_material = materiales.first()
-            print(f"🔍 Primer material:")
-            print(f"  - ID: {primer_material.id}")
-            print(f"  - Codigo: {primer_material.codigo_interno}")
-            print(f"  - numero_entrega_parcial: {primer_material.numero_entrega_parcial}")
-            print(f"  - Lote: {primer_material.lote.numero_lote}")
-
         # ✅ USAR SERIALIZER CON CONTEXTO
         serializer = MaterialListSerializer(
             materiales,
@@ -477,17 +460,10 @@ class LaboratorioConsultaView(APIView):
             context={'request': request}
         )
 
-        # 🔍 DEBUG DEL SERIALIZER
         data = serializer.data
-        if data:
-            print(f"🔍 Primer item serializado:")
-            print(f"  - Keys: {list(data[0].keys())}")
-            print(f"  - numero_entrega_parcial en data: {'numero_entrega_parcial' in data[0]}")
-            if 'numero_entrega_parcial' in data[0]:
-                print(f"  - Valor: {data[0]['numero_entrega_parcial']}")
 
         return Response({
-            'total': materiales.count(),
+            'total': len(data),
             'materiales': data,
             'mensaje': 'Estos materiales requieren inspección inicial obligatoria'
         })
@@ -498,8 +474,8 @@ class LaboratorioConsultaView(APIView):
         fecha_limite = datetime.now() - timedelta(days=dias_limite)
 
         try:
-            tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
-            estado_laboratorio = EstadoMaterialONU.objects.get(codigo='EN_LABORATORIO', activo=True)
+            tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
+            estado_laboratorio = obtener_por_codigo(EstadoMaterialONU, 'EN_LABORATORIO')
         except (TipoMaterial.DoesNotExist, EstadoMaterialONU.DoesNotExist):
             return Response(
                 {'error': 'Configuración de laboratorio incompleta'},
@@ -536,7 +512,7 @@ class LaboratorioConsultaView(APIView):
         fecha_desde = datetime.now() - timedelta(days=dias_historial)
 
         try:
-            estado_disponible = EstadoMaterialONU.objects.get(codigo='DISPONIBLE', activo=True)
+            estado_disponible = obtener_por_codigo(EstadoMaterialONU, 'DISPONIBLE')
         except EstadoMaterialONU.DoesNotExist:
             estado_disponible = None
 
@@ -691,10 +667,10 @@ class InspeccionLaboratorioView(APIView):
                 material = inspeccion.material
 
                 if inspeccion.aprobado:
-                    estado_disponible = EstadoMaterialONU.objects.get(codigo='DISPONIBLE', activo=True)
+                    estado_disponible = obtener_por_codigo(EstadoMaterialONU, 'DISPONIBLE')
                     material.estado_onu = estado_disponible
                 else:
-                    estado_defectuoso = EstadoMaterialONU.objects.get(codigo='DEFECTUOSO', activo=True)
+                    estado_defectuoso = obtener_por_codigo(EstadoMaterialONU, 'DEFECTUOSO')
                     material.estado_onu = estado_defectuoso
 
                 material.fecha_retorno_laboratorio = timezone.now()
@@ -748,8 +724,8 @@ class InspeccionLaboratorioView(APIView):
 
         try:
             # Verificar que todos los materiales estén en laboratorio
-            tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
-            estado_laboratorio = EstadoMaterialONU.objects.get(codigo='EN_LABORATORIO', activo=True)
+            tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
+            estado_laboratorio = obtener_por_codigo(EstadoMaterialONU, 'EN_LABORATORIO')
 
             materiales = Material.objects.filter(
                 id__in=materiales_ids,
@@ -799,10 +775,10 @@ class InspeccionLaboratorioView(APIView):
 
                     # Actualizar estado del material
                     if inspeccion.aprobado:
-                        estado_disponible = EstadoMaterialONU.objects.get(codigo='DISPONIBLE', activo=True)
+                        estado_disponible = obtener_por_codigo(EstadoMaterialONU, 'DISPONIBLE')
                         material.estado_onu = estado_disponible
                     else:
-                        estado_defectuoso = EstadoMaterialONU.objects.get(codigo='DEFECTUOSO', activo=True)
+                        estado_defectuoso = obtener_por_codigo(EstadoMaterialONU, 'DEFECTUOSO')
                         material.estado_onu = estado_defectuoso
 
                     material.fecha_retorno_laboratorio = timezone.now()
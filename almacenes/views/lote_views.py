@@ -2,16 +2,21 @@
 # almacenes/views/lote_views.py - ACTUALIZADO COMPLETO
 # Views para gestión de lotes y importación masiva
 # ======================================================
+import logging
 import pandas as pd
-import re
-from django.db import transaction
-from django.http import JsonResponse
+from collections import defaultdict
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
 from django.db.models import Max, Sum
-from django.db.models import Count, F, Q
-from rest_framework import viewsets, status, filters
+from django.db.models import Count, F, Q, Prefetch, prefetch_related_objects
+from rest_framework import viewsets, status, filters, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
@@ -19,25 +24,42 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
 
 from ..models import (
-    Lote, LoteDetalle, EntregaParcialLote, Material, Almacen,
+    Lote, LoteDetalle, EntregaParcialLote, Material, Almacen, Proveedor,
     TipoIngreso, EstadoLote, TipoMaterial, EstadoMaterialONU, Modelo,
     EntregaParcialLote, generar_numero_lote, EstadoMaterialGeneral
 )
+from ..cache import (
+    obtener_por_codigo, clave_resumen_lote, invalidar_cache_lote,
+    CLAVE_ESTADISTICAS_LOTES, TIEMPO_CACHE_LOTES
+)
+from ..importacion import (
+    leer_archivo_importacion, columna_como_texto, item_equipo_valido, PATRON_MAC, TAMANO_MAXIMO_ARCHIVO
+)
+from ..pagination import MaterialCursorPagination
 from ..serializers import (
     LoteSerializer, LoteCreateSerializer, LoteDetalleSerializer,
     EntregaParcialLoteSerializer,
     MaterialListSerializer, ImportacionMasivaSerializer
 )
 
+logger = logging.getLogger(__name__)
+
 
 class LoteViewSet(viewsets.ModelViewSet):
     """ViewSet para gestión completa de lotes"""
-    queryset = Lote.objects.all().select_related(
-        'proveedor', 'almacen_destino', 'tipo_servicio', 'created_by',
-        'tipo_ingreso', 'estado'
-    ).prefetch_related('detalles__modelo__marca')
+    # estado y tipo_ingreso los usan las validaciones de casi todas las acciones
+    queryset = Lote.objects.all().select_related('tipo_ingreso', 'estado')
     permission_classes = [IsAuthenticated]
 
+    # Acciones que muestran el resto de relaciones del lote (proveedor, almacén, etc.)
+    ACCIONES_CON_RELACIONES = ['list', 'retrieve', 'resumen', 'info_importacion']
+    # Acciones que recorren detalles / entregas parciales del lote
+    # (resumen precarga en _calcular_resumen, solo cuando no está en caché)
+    ACCIONES_CON_DETALLES = ['list', 'retrieve', 'info_importacion', 'completar_recepcion', 'eliminar']
+    ACCIONES_CON_ENTREGAS = ['list', 'retrieve', 'info_importacion', 'entregas_parciales']
+    # Acciones que serializan cantidad_total / cantidad_recibida de cada lote
+    ACCIONES_CON_CANTIDADES = ['list', 'retrieve']
+
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = [
         'tipo_ingreso', 'estado', 'proveedor', 'almacen_destino', 'tipo_servicio'
@@ -48,6 +70,44 @@ class LoteViewSet(viewsets.ModelViewSet):
     ordering_fields = ['numero_lote', 'fecha_recepcion', 'created_at']
     ordering = ['-created_at']
 
+    def get_queryset(self):
+        """Precargar solo las relaciones que usa cada acción"""
+        queryset = super().get_queryset()
+
+        if self.action in self.ACCIONES_CON_RELACIONES:
+            queryset = queryset.select_related(
+                'proveedor', 'almacen_destino', 'tipo_servicio', 'created_by', 'sector_solicitante'
+            )
+
+        if self.action in self.ACCIONES_CON_DETALLES:
+            queryset = queryset.prefetch_related(self._prefetch_detalles())
+
+        if self.action in self.ACCIONES_CON_ENTREGAS:
+            queryset = queryset.prefetch_related(self._prefetch_entregas())
+
+        if self.action in self.ACCIONES_CON_CANTIDADES:
+            queryset = Lote.anotar_cantidades(queryset)
+
+        return queryset
+
+    @staticmethod
+    def _prefetch_detalles():
+        return Prefetch(
+            'detalles',
+            queryset=LoteDetalle.objects.select_related(
+                'modelo__marca', 'modelo__tipo_material', 'modelo__unidad_medida'
+            )
+        )
+
+    @staticmethod
+    def _prefetch_entregas():
+        return Prefetch(
+            'entregas_parciales',
+            queryset=EntregaParcialLote.objects.select_related(
+                'estado_entrega', 'created_by'
+            ).order_by('numero_entrega')
+        )
+
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return LoteCreateSerializer
@@ -63,7 +123,7 @@ class LoteViewSet(viewsets.ModelViewSet):
 
         # Verificar si el lote permite más importaciones
         try:
-            estado_cerrado = EstadoLote.objects.get(codigo='CERRADO', activo=True)
+            estado_cerrado = obtener_por_codigo(EstadoLote, 'CERRADO')
             if lote.estado == estado_cerrado:
                 return Response(
                     {'error': 'El lote está cerrado y no permite más importaciones'},
@@ -73,12 +133,13 @@ class LoteViewSet(viewsets.ModelViewSet):
             pass
 
         # Obtener entregas parciales ordenadas
-        entregas_parciales = lote.entregas_parciales.all().order_by('numero_entrega')
+        entregas_parciales = lote.entregas_parciales.all()  # precargadas y ordenadas
 
-        # Calcular estadísticas
-        cantidad_total = lote.cantidad_total
-        cantidad_recibida = lote.cantidad_recibida
-        cantidad_pendiente = lote.cantidad_pendiente
+        # Calcular estadísticas (una sola consulta)
+        estadisticas = Lote.calcular_estadisticas(lote.pk)
+        cantidad_total = estadisticas['cantidad_total']
+        cantidad_recibida = estadisticas['cantidad_recibida']
+        cantidad_pendiente = estadisticas['cantidad_pendiente']
 
         # Información de la próxima entrega
         proxima_entrega = lote.total_entregas_parciales + 1
@@ -131,7 +192,7 @@ class LoteViewSet(viewsets.ModelViewSet):
                 'cantidad_total': cantidad_total,
                 'cantidad_recibida': cantidad_recibida,
                 'cantidad_pendiente': cantidad_pendiente,
-                'porcentaje_recibido': lote.porcentaje_recibido,
+                'porcentaje_recibido': estadisticas['porcentaje_recibido'],
                 'tiene_entregas_parciales': tiene_entregas_parciales
             },
             'entregas_parciales': {
@@ -151,27 +212,49 @@ class LoteViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def resumen(self, request, pk=None):
         """Resumen estadístico completo del lote"""
+        # get_object primero: 404 y permisos se aplican también cuando hay caché
         lote = self.get_object()
+        datos = cache.get(clave_resumen_lote(lote.pk))
+        if datos is None:
+            datos = self._calcular_resumen(lote)
+            cache.set(clave_resumen_lote(lote.pk), datos, TIEMPO_CACHE_LOTES)
+        return Response(datos)
+
+    def _calcular_resumen(self, lote):
+        """Construir los datos del resumen (se cachean en resumen)"""
+        prefetch_related_objects([lote], self._prefetch_detalles(), self._prefetch_entregas())
+
+        # Estadísticas básicas (una sola consulta)
+        estadisticas = Lote.calcular_estadisticas(lote.pk)
+
+        # Resumen por modelo (detalles ya precargados con modelo, marca, tipo y unidad)
+        detalles = list(lote.detalles.all())
+
+        # Conteo de materiales por (modelo, estado ONU) en un solo GROUP BY
+        recibidos_por_modelo = defaultdict(int)
+        estados_por_modelo = defaultdict(dict)
+        for modelo_id, estado_onu_id, total in Material.objects.filter(lote=lote).order_by().values_list(
+            'modelo_id', 'estado_onu_id'
+        ).annotate(total=Count('id')):
+            recibidos_por_modelo[modelo_id] += total
+            if estado_onu_id:
+                estados_por_modelo[modelo_id][estado_onu_id] = total
+
+        estados_onu = []
+        if any(detalle.modelo.tipo_material.es_unico for detalle in detalles):
+            estados_onu = list(EstadoMaterialONU.objects.filter(activo=True))
 
-        # Estadísticas básicas
-        cantidad_total = lote.cantidad_total
-        cantidad_recibida = lote.cantidad_recibida
-        cantidad_pendiente = lote.cantidad_pendiente
-        porcentaje_recibido = lote.porcentaje_recibido
-
-        # Resumen por modelo
         detalles_info = []
-        for detalle in lote.detalles.all():
-            materiales_del_modelo = lote.material_set.filter(modelo=detalle.modelo)
+        for detalle in detalles:
+            cantidad_recibida = recibidos_por_modelo[detalle.modelo_id]
 
             # Estados de materiales de este modelo (solo para ONUs)
             estados_info = {}
             if detalle.modelo.tipo_material.es_unico:
-                estados_onu = EstadoMaterialONU.objects.filter(activo=True)
+                conteo_estados = estados_por_modelo[detalle.modelo_id]
                 for estado in estados_onu:
-                    count = materiales_del_modelo.filter(estado_onu=estado).count()
-                    if count > 0:
-                        estados_info[estado.nombre] = count
+                    if conteo_estados.get(estado.id):
+                        estados_info[estado.nombre] = conteo_estados[estado.id]
 
             detalles_info.append({
                 'modelo_id': detalle.modelo.id,
@@ -180,18 +263,18 @@ class LoteViewSet(viewsets.ModelViewSet):
                 'tipo_material': detalle.modelo.tipo_material.nombre if detalle.modelo.tipo_material else 'Sin tipo',
                 'unidad_medida': detalle.modelo.unidad_medida.simbolo if detalle.modelo.unidad_medida else 'N/A',
                 'cantidad_esperada': detalle.cantidad,
-                'cantidad_recibida': materiales_del_modelo.count(),
-                'cantidad_pendiente': max(0, detalle.cantidad - materiales_del_modelo.count()),
+                'cantidad_recibida': cantidad_recibida,
+                'cantidad_pendiente': max(0, detalle.cantidad - cantidad_recibida),
                 'porcentaje_recibido': round(
-                    (materiales_del_modelo.count() / detalle.cantidad * 100), 2
+                    (cantidad_recibida / detalle.cantidad * 100), 2
                 ) if detalle.cantidad > 0 else 0,
                 'estados_materiales': estados_info
             })
 
-        # Entregas parciales
-        entregas = lote.entregas_parciales.all().order_by('numero_entrega')
+        # Entregas parciales (precargadas y ordenadas)
+        entregas = [_entrega_parcial_como_dict(entrega) for entrega in lote.entregas_parciales.all()]
 
-        return Response({
+        return {
             'lote': {
                 'id': lote.id,
                 'numero_lote': lote.numero_lote,
@@ -204,25 +287,23 @@ class LoteViewSet(viewsets.ModelViewSet):
                 'fecha_fin_garantia': lote.fecha_fin_garantia
             },
             'estadisticas': {
-                'cantidad_total': cantidad_total,
-                'cantidad_recibida': cantidad_recibida,
-                'cantidad_pendiente': cantidad_pendiente,
-                'porcentaje_recibido': porcentaje_recibido,
+                **estadisticas,
                 'total_entregas_parciales': lote.total_entregas_parciales
             },
             'detalles_por_modelo': detalles_info,
-            'entregas_parciales': EntregaParcialLoteSerializer(entregas, many=True).data,
+            'entregas_parciales': entregas,
+            # detalles ya está en memoria (precarga): any() no consulta la BD, a diferencia de exists()
             'requiere_laboratorio': any(
                 detalle.modelo.requiere_inspeccion_inicial
-                for detalle in lote.detalles.all()
+                for detalle in detalles
             )
-        })
+        }
 
     @action(detail=True, methods=['get'])
     def entregas_parciales(self, request, pk=None):
         """Obtener entregas parciales de un lote"""
         lote = self.get_object()
-        entregas = lote.entregas_parciales.all().order_by('numero_entrega')
+        entregas = lote.entregas_parciales.all()  # precargadas y ordenadas
 
         serializer = EntregaParcialLoteSerializer(entregas, many=True)
         return Response(serializer.data)
@@ -233,7 +314,7 @@ class LoteViewSet(viewsets.ModelViewSet):
         lote = self.get_object()
 
         try:
-            estado_cerrado = EstadoLote.objects.get(codigo='CERRADO', activo=True)
+            estado_cerrado = obtener_por_codigo(EstadoLote, 'CERRADO')
             if lote.estado == estado_cerrado:
                 return Response(
                     {'error': 'No se pueden agregar entregas a un lote cerrado'},
@@ -242,37 +323,61 @@ class LoteViewSet(viewsets.ModelViewSet):
         except EstadoLote.DoesNotExist:
             pass
 
-        data = request.data.copy()
+        # Solo los campos editables de la entrega, sin copiar todo el payload (QueryDict/archivos)
+        data = {
+            campo: request.data[campo]
+            for campo in ('fecha_entrega', 'cantidad_entregada', 'estado_entrega', 'observaciones')
+            if campo in request.data
+        }
         data['lote'] = lote.id
-        data['numero_entrega'] = lote.total_entregas_parciales + 1
 
-        serializer = EntregaParcialLoteSerializer(data=data)
-        if serializer.is_valid():
-            with transaction.atomic():
+        with transaction.atomic():
+            # Bloquear el lote: dos entregas concurrentes no pueden tomar el mismo número
+            Lote.objects.select_for_update().filter(pk=lote.pk).values_list('pk', flat=True).get()
+
+            # Siguiente número según las entregas reales: la importación masiva también crea
+            # entregas sin pasar por el contador total_entregas_parciales
+            ultimo_numero = lote.entregas_parciales.aggregate(ultimo=Max('numero_entrega'))['ultimo']
+            data['numero_entrega'] = (ultimo_numero or 0) + 1
+
+            serializer = EntregaParcialLoteSerializer(data=data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
                 entrega = serializer.save(created_by=request.user)
+            except IntegrityError:
+                # La importación masiva creó una entrega con ese número sin pasar por el bloqueo
+                transaction.set_rollback(True)
+                return Response(
+                    {'error': 'Otra operación registró una entrega para este lote. Intente nuevamente.'},
+                    status=status.HTTP_409_CONFLICT
+                )
 
-                # Actualizar contador en el lote
-                lote.total_entregas_parciales += 1
+            # Incrementar el contador en la BD (F) para no pisar entregas concurrentes
+            campos = {
+                'total_entregas_parciales': F('total_entregas_parciales') + 1,
+                'updated_at': timezone.now()
+            }
 
-                # Actualizar estado del lote según las entregas
-                try:
-                    if lote.cantidad_recibida >= lote.cantidad_total:
-                        estado_completa = EstadoLote.objects.get(codigo='RECEPCION_COMPLETA', activo=True)
-                        lote.estado = estado_completa
-                    else:
-                        estado_parcial = EstadoLote.objects.get(codigo='RECEPCION_PARCIAL', activo=True)
-                        lote.estado = estado_parcial
-                except EstadoLote.DoesNotExist:
-                    pass
+            # Actualizar estado del lote según las entregas
+            try:
+                estadisticas = Lote.calcular_estadisticas(lote.pk)
+                if estadisticas['cantidad_recibida'] >= estadisticas['cantidad_total']:
+                    campos['estado'] = obtener_por_codigo(EstadoLote, 'RECEPCION_COMPLETA')
+                else:
+                    campos['estado'] = obtener_por_codigo(EstadoLote, 'RECEPCION_PARCIAL')
+            except EstadoLote.DoesNotExist:
+                pass
 
-                lote.save()
+            Lote.objects.filter(pk=lote.pk).update(**campos)
 
-            return Response(
-                EntregaParcialLoteSerializer(entrega).data,
-                status=status.HTTP_201_CREATED
-            )
+        invalidar_cache_lote(lote.pk)
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            EntregaParcialLoteSerializer(entrega).data,
+            status=status.HTTP_201_CREATED
+        )
 
     @action(detail=True, methods=['get'], url_path='entregas_parciales_disponibles')
     def entregas_parciales_disponibles(self, request, pk=None):
@@ -334,7 +439,7 @@ class LoteViewSet(viewsets.ModelViewSet):
 
         # Verificar que el lote no esté cerrado
         try:
-            estado_cerrado = EstadoLote.objects.get(codigo='CERRADO', activo=True)
+            estado_cerrado = obtener_por_codigo(EstadoLote, 'CERRADO')
             if lote.estado == estado_cerrado:
                 return Response(
                     {'error': 'No se pueden eliminar entregas de un lote cerrado'},
@@ -405,17 +510,17 @@ class LoteViewSet(viewsets.ModelViewSet):
             numero_entrega_eliminada = entrega.numero_entrega
             materiales_eliminados = 0
 
-            print(f"🗑️ BACKEND: Eliminando entrega #{numero_entrega_eliminada}")
-            print(f"🗑️ BACKEND: delete_materials={delete_materials}, materiales_count={materiales_count}")
+            logger.debug("🗑️ BACKEND: Eliminando entrega #%s", numero_entrega_eliminada)
+            logger.debug("🗑️ BACKEND: delete_materials=%s, materiales_count=%s", delete_materials, materiales_count)
 
             if materiales_count > 0:
                 if delete_materials:
                     # Opción 1: Eliminar completamente los materiales
-                    print(f"🗑️ BACKEND: Eliminando {materiales_count} materiales del sistema")
+                    logger.debug("🗑️ BACKEND: Eliminando %s materiales del sistema", materiales_count)
 
                     # Verificar si los materiales tienen dependencias
                     materiales_con_dependencias = []
-                    for material in materiales_asociados:
+                    for material in materiales_asociados.iterator(chunk_size=500):
                         # Verificar si el material está en otros procesos (laboratorio, etc.)
                         if hasattr(material, 'enviado_laboratorio') and material.enviado_laboratorio:
                             materiales_con_dependencias.append(material.codigo_interno)
@@ -433,12 +538,12 @@ class LoteViewSet(viewsets.ModelViewSet):
                     # Eliminar materiales
                     materiales_eliminados = materiales_count
                     materiales_asociados.delete()
-                    print(f"✅ BACKEND: {materiales_eliminados} materiales eliminados del sistema")
+                    logger.debug("✅ BACKEND: %s materiales eliminados del sistema", materiales_eliminados)
 
                 else:
                     # Opción 2: Solo desasociar materiales (comportamiento anterior)
                     materiales_asociados.update(numero_entrega_parcial=None)
-                    print(f"🔄 BACKEND: {materiales_count} materiales desasociados")
+                    logger.debug("🔄 BACKEND: %s materiales desasociados", materiales_count)
 
             # Eliminar la entrega
             entrega.delete()
@@ -449,12 +554,12 @@ class LoteViewSet(viewsets.ModelViewSet):
                 numero_entrega__gt=numero_entrega_eliminada
             ).order_by('numero_entrega')
 
-            print(f"🔄 BACKEND: Reordenando {len(entregas_posteriores)} entregas posteriores")
+            logger.debug("🔄 BACKEND: Reordenando %s entregas posteriores", len(entregas_posteriores))
 
             for entrega_posterior in entregas_posteriores:
                 nuevo_numero = entrega_posterior.numero_entrega - 1
                 entrega_posterior.numero_entrega = nuevo_numero
-                entrega_posterior.save()
+                entrega_posterior.save(update_fields=['numero_entrega'])
 
                 # Actualizar materiales de entregas posteriores (solo si no se eliminaron)
                 if not delete_materials:
@@ -468,30 +573,31 @@ class LoteViewSet(viewsets.ModelViewSet):
 
             # Actualizar estado del lote
             try:
-                entregas_restantes = lote.entregas_parciales.count()
-                if entregas_restantes == 0:
-                    estado_registrado = EstadoLote.objects.get(codigo='REGISTRADO', activo=True)
+                # Consultar de nuevo: la relación precargada ya no refleja la entrega eliminada
+                entregas_restantes = list(EntregaParcialLote.objects.filter(lote=lote))
+                if not entregas_restantes:
+                    estado_registrado = obtener_por_codigo(EstadoLote, 'REGISTRADO')
                     lote.estado = estado_registrado
                 else:
                     # Recalcular estado basado en entregas restantes
-                    total_en_entregas = sum(e.cantidad_entregada for e in lote.entregas_parciales.all())
+                    total_en_entregas = sum(e.cantidad_entregada for e in entregas_restantes)
                     total_materiales_restantes = Material.objects.filter(lote=lote).count()
 
                     if total_materiales_restantes == 0:
-                        estado_registrado = EstadoLote.objects.get(codigo='REGISTRADO', activo=True)
+                        estado_registrado = obtener_por_codigo(EstadoLote, 'REGISTRADO')
                         lote.estado = estado_registrado
                     elif total_en_entregas >= lote.cantidad_total:
-                        estado_completa = EstadoLote.objects.get(codigo='RECEPCION_COMPLETA', activo=True)
+                        estado_completa = obtener_por_codigo(EstadoLote, 'RECEPCION_COMPLETA')
                         lote.estado = estado_completa
                     else:
-                        estado_parcial = EstadoLote.objects.get(codigo='RECEPCION_PARCIAL', activo=True)
+                        estado_parcial = obtener_por_codigo(EstadoLote, 'RECEPCION_PARCIAL')
                         lote.estado = estado_parcial
             except EstadoLote.DoesNotExist:
                 pass
 
-            lote.save()
+            lote.save(update_fields=['total_entregas_parciales', 'estado', 'updated_at'])
 
-            print(f"✅ BACKEND: Operación completada exitosamente")
+            logger.debug("✅ BACKEND: Operación completada exitosamente")
 
         # Preparar mensaje de respuesta
         if delete_materials and materiales_eliminados > 0:
@@ -513,45 +619,42 @@ class LoteViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def cerrar_lote(self, request, pk=None):
         """Cerrar lote (no se pueden agregar más materiales)"""
-        lote = self.get_object()
-
         try:
-            estado_cerrado = EstadoLote.objects.get(codigo='CERRADO', activo=True)
-            if lote.estado == estado_cerrado:
-                return Response(
-                    {'error': 'El lote ya está cerrado'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            estado_cerrado = obtener_por_codigo(EstadoLote, 'CERRADO')
         except EstadoLote.DoesNotExist:
             return Response(
                 {'error': 'Estado CERRADO no configurado'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        lote = self.get_object()
+
+        # UPDATE condicional: cambia el estado solo si el lote aún no está cerrado
+        ahora = timezone.now()
         with transaction.atomic():
-            lote.estado = estado_cerrado
-            lote.save()
+            actualizados = Lote.objects.filter(pk=lote.pk).exclude(estado=estado_cerrado).update(
+                estado=estado_cerrado, updated_at=ahora
+            )
 
+        if not actualizados:
+            return Response(
+                {'error': 'El lote ya está cerrado'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        invalidar_cache_lote(lote.pk)
         return Response({
             'message': f'Lote {lote.numero_lote} cerrado correctamente',
-            'estado': lote.estado.nombre if lote.estado else 'Sin estado',
-            'fecha_cierre': lote.updated_at
+            'estado': estado_cerrado.nombre,
+            'fecha_cierre': ahora
         })
 
     @action(detail=True, methods=['post'])
     def reabrir_lote(self, request, pk=None):
         """Reabrir lote cerrado (solo para administradores)"""
-        lote = self.get_object()
-
         try:
-            estado_cerrado = EstadoLote.objects.get(codigo='CERRADO', activo=True)
-            estado_activo = EstadoLote.objects.get(codigo='ACTIVO', activo=True)
-
-            if lote.estado != estado_cerrado:
-                return Response(
-                    {'error': 'Solo se pueden reabrir lotes cerrados'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            estado_cerrado = obtener_por_codigo(EstadoLote, 'CERRADO')
+            estado_activo = obtener_por_codigo(EstadoLote, 'ACTIVO')
         except EstadoLote.DoesNotExist:
             return Response(
                 {'error': 'Estados de lote no configurados correctamente'},
@@ -564,13 +667,24 @@ class LoteViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
+        lote = self.get_object()
+
+        # UPDATE condicional: solo reabre si el lote está cerrado
         with transaction.atomic():
-            lote.estado = estado_activo
-            lote.save()
+            actualizados = Lote.objects.filter(pk=lote.pk, estado=estado_cerrado).update(
+                estado=estado_activo, updated_at=timezone.now()
+            )
 
+        if not actualizados:
+            return Response(
+                {'error': 'Solo se pueden reabrir lotes cerrados'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        invalidar_cache_lote(lote.pk)
         return Response({
             'message': f'Lote {lote.numero_lote} reabierto correctamente',
-            'estado': lote.estado.nombre if lote.estado else 'Sin estado'
+            'estado': estado_activo.nombre
         })
 
     @action(detail=False, methods=['get'])
@@ -592,7 +706,23 @@ class LoteViewSet(viewsets.ModelViewSet):
     def materiales(self, request, pk=None):
         """Obtener todos los materiales del lote"""
         lote = self.get_object()
-        materiales = lote.material_set.all()
+        materiales = lote.material_set.select_related(
+            'modelo__marca', 'modelo__tipo_material', 'lote__proveedor', 'lote__almacen_destino',
+            'almacen_actual', 'tipo_material', 'estado_onu', 'estado_general'
+        ).only(
+            # Solo las columnas que usa MaterialListSerializer
+            'id', 'codigo_interno', 'mac_address', 'gpon_serial', 'serial_manufacturer',
+            'codigo_item_equipo', 'cantidad', 'es_nuevo', 'numero_entrega_parcial',
+            'created_at', 'updated_at',
+            'modelo__nombre', 'modelo__codigo_modelo', 'modelo__marca__nombre', 'modelo__tipo_material__nombre',
+            'lote__numero_lote', 'lote__fecha_recepcion', 'lote__proveedor__nombre_comercial',
+            'lote__almacen_destino__codigo', 'lote__almacen_destino__nombre',
+            'almacen_actual__codigo', 'almacen_actual__nombre', 'almacen_actual__ciudad',
+            'tipo_material__codigo', 'tipo_material__nombre', 'tipo_material__es_unico',
+            'estado_onu__codigo', 'estado_onu__nombre', 'estado_onu__color', 'estado_onu__permite_asignacion',
+            'estado_general__codigo', 'estado_general__nombre', 'estado_general__color',
+            'estado_general__permite_consumo'
+        )
 
         # Filtros opcionales
         tipo_material_codigo = request.query_params.get('tipo_material')
@@ -600,39 +730,26 @@ class LoteViewSet(viewsets.ModelViewSet):
         modelo_id = request.query_params.get('modelo_id')
 
         if tipo_material_codigo:
-            try:
-                tipo_material = TipoMaterial.objects.get(codigo=tipo_material_codigo, activo=True)
-                materiales = materiales.filter(tipo_material=tipo_material)
-            except TipoMaterial.DoesNotExist:
-                pass
+            materiales = materiales.filter(
+                tipo_material__codigo=tipo_material_codigo, tipo_material__activo=True
+            )
 
-        if estado:
-            if tipo_material_codigo:
-                try:
-                    tipo_material = TipoMaterial.objects.get(codigo=tipo_material_codigo, activo=True)
-                    if tipo_material.es_unico:
-                        try:
-                            estado_obj = EstadoMaterialONU.objects.get(codigo=estado, activo=True)
-                            materiales = materiales.filter(estado_onu=estado_obj)
-                        except EstadoMaterialONU.DoesNotExist:
-                            pass
-                    else:
-                        try:
-                            from ..models import EstadoMaterialGeneral
-                            estado_obj = EstadoMaterialGeneral.objects.get(codigo=estado, activo=True)
-                            materiales = materiales.filter(estado_general=estado_obj)
-                        except:
-                            pass
-                except TipoMaterial.DoesNotExist:
-                    pass
+            # El estado depende del tipo: ONUs usan estado_onu, el resto estado_general
+            if estado:
+                materiales = materiales.filter(
+                    Q(tipo_material__es_unico=True, estado_onu__codigo=estado, estado_onu__activo=True) |
+                    Q(tipo_material__es_unico=False, estado_general__codigo=estado, estado_general__activo=True)
+                )
 
         if modelo_id:
             materiales = materiales.filter(modelo_id=modelo_id)
 
-        page = self.paginate_queryset(materiales)
-        if page is not None:
+        # Paginación por cursor a pedido (?page_size= / ?cursor=); sin parámetros se mantiene la lista completa
+        if 'cursor' in request.query_params or 'page_size' in request.query_params:
+            paginador = MaterialCursorPagination()
+            page = paginador.paginate_queryset(materiales, request)  # sin view: orden fijo por -id
             serializer = MaterialListSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return paginador.get_paginated_response(serializer.data)
 
         serializer = MaterialListSerializer(materiales, many=True)
         return Response(serializer.data)
@@ -643,9 +760,9 @@ class LoteViewSet(viewsets.ModelViewSet):
         lote = self.get_object()
 
         try:
-            tipo_nuevo = TipoIngreso.objects.get(codigo='NUEVO', activo=True)
-            tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
-            estado_nuevo = EstadoMaterialONU.objects.get(codigo='NUEVO', activo=True)
+            tipo_nuevo = obtener_por_codigo(TipoIngreso, 'NUEVO')
+            tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
+            estado_nuevo = obtener_por_codigo(EstadoMaterialONU, 'NUEVO')
 
             if lote.tipo_ingreso != tipo_nuevo:
                 return Response(
@@ -665,18 +782,15 @@ class LoteViewSet(viewsets.ModelViewSet):
             estado_onu=estado_nuevo
         )
 
-        if not materiales_nuevos.exists():
+        with transaction.atomic():
+            count = Material.enviar_a_laboratorio_masivo(materiales_nuevos)
+
+        if not count:
             return Response(
                 {'message': 'No hay materiales nuevos que requieran inspección'},
                 status=status.HTTP_200_OK
             )
 
-        with transaction.atomic():
-            count = 0
-            for material in materiales_nuevos:
-                material.enviar_a_laboratorio(usuario=request.user)
-                count += 1
-
         return Response({
             'message': f'{count} materiales enviados a laboratorio para inspección inicial',
             'materiales_enviados': count,
@@ -686,43 +800,52 @@ class LoteViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def estadisticas(self, request):
         """Estadísticas generales de lotes"""
-        # Lotes por estado
-        por_estado = {}
-        estados = EstadoLote.objects.filter(activo=True)
-        for estado in estados:
-            count = Lote.objects.filter(estado=estado).count()
-            por_estado[estado.nombre] = count
-
-        # Lotes por tipo de ingreso
-        por_tipo = {}
-        tipos = TipoIngreso.objects.filter(activo=True)
-        for tipo in tipos:
-            count = Lote.objects.filter(tipo_ingreso=tipo).count()
-            por_tipo[tipo.nombre] = count
-
-        # Top proveedores por cantidad de lotes
-        from django.db.models import Count
-        top_proveedores = Lote.objects.values(
-            'proveedor__nombre_comercial'
-        ).annotate(
-            total_lotes=Count('id')
-        ).order_by('-total_lotes')[:10]
+        datos = cache.get(CLAVE_ESTADISTICAS_LOTES)
+        if datos is None:
+            datos = self._calcular_estadisticas()
+            cache.set(CLAVE_ESTADISTICAS_LOTES, datos, TIEMPO_CACHE_LOTES)
+        return Response(datos)
+
+    def _calcular_estadisticas(self):
+        """Construir las estadísticas generales (se cachean en estadisticas)"""
+        estados = list(EstadoLote.objects.filter(activo=True))
+        tipos = list(TipoIngreso.objects.filter(activo=True))
+
+        # Total, activos, por estado y por tipo de ingreso: una sola consulta con conteos condicionales
+        conteos = Lote.objects.aggregate(
+            total_lotes=Count('id'),
+            lotes_activos=Count('id', filter=Q(estado_id__in=[
+                estado.id for estado in estados if estado.codigo in ('ACTIVO', 'RECEPCION_PARCIAL')
+            ])),
+            **{f'estado_{estado.id}': Count('id', filter=Q(estado_id=estado.id)) for estado in estados},
+            **{f'tipo_{tipo.id}': Count('id', filter=Q(tipo_ingreso_id=tipo.id)) for tipo in tipos}
+        )
+        por_estado = {estado.nombre: conteos[f'estado_{estado.id}'] for estado in estados}
+        por_tipo = {tipo.nombre: conteos[f'tipo_{tipo.id}'] for tipo in tipos}
 
-        # Lotes activos
-        try:
-            estado_activo = EstadoLote.objects.get(codigo='ACTIVO', activo=True)
-            estado_parcial = EstadoLote.objects.get(codigo='RECEPCION_PARCIAL', activo=True)
-            lotes_activos = Lote.objects.filter(estado__in=[estado_activo, estado_parcial]).count()
-        except EstadoLote.DoesNotExist:
-            lotes_activos = 0
+        # Top proveedores por cantidad de lotes: se agrupa por proveedor_id (índice de la FK,
+        # sin JOIN) y luego se buscan solo los 10 nombres (nombre_comercial es único)
+        top_proveedores = list(Lote.objects.values('proveedor_id').annotate(
+            total_lotes=Count('id')
+        ).order_by('-total_lotes')[:10])
+        nombres = dict(Proveedor.objects.filter(
+            id__in=[fila['proveedor_id'] for fila in top_proveedores]
+        ).values_list('id', 'nombre_comercial'))
+        top_proveedores = [
+            {
+                'proveedor__nombre_comercial': nombres[fila['proveedor_id']],
+                'total_lotes': fila['total_lotes']
+            }
+            for fila in top_proveedores
+        ]
 
-        return Response({
-            'total_lotes': Lote.objects.count(),
+        return {
+            'total_lotes': conteos['total_lotes'],
             'por_estado': por_estado,
             'por_tipo_ingreso': por_tipo,
-            'top_proveedores': list(top_proveedores),
-            'lotes_activos': lotes_activos
-        })
+            'top_proveedores': top_proveedores,
+            'lotes_activos': conteos['lotes_activos']
+        }
 
     @action(detail=True, methods=['post'])
     def completar_recepcion(self, request, pk=None):
@@ -731,7 +854,7 @@ class LoteViewSet(viewsets.ModelViewSet):
 
         # Validar que no esté cerrado
         try:
-            estado_cerrado = EstadoLote.objects.get(codigo='CERRADO', activo=True)
+            estado_cerrado = obtener_por_codigo(EstadoLote, 'CERRADO')
             if lote.estado == estado_cerrado:
                 return Response({
                     'error': 'El lote está cerrado'
@@ -750,9 +873,7 @@ class LoteViewSet(viewsets.ModelViewSet):
                     if cantidad_pendiente > 0:
                         # Crear material por cantidad
                         try:
-                            estado_disponible = EstadoMaterialGeneral.objects.get(
-                                codigo='DISPONIBLE', activo=True
-                            )
+                            estado_disponible = obtener_por_codigo(EstadoMaterialGeneral, 'DISPONIBLE')
                         except EstadoMaterialGeneral.DoesNotExist:
                             estado_disponible = None
 
@@ -780,6 +901,113 @@ class LoteViewSet(viewsets.ModelViewSet):
 # almacenes/views/lote_views.py - ImportacionMasivaView COMPLETA
 # ======================================================
 
+# Campos de fecha de DRF reutilizados para dar a las entregas el mismo formato que el serializer
+_CAMPO_FECHA = serializers.DateField()
+_CAMPO_FECHA_HORA = serializers.DateTimeField()
+
+
+def _entrega_parcial_como_dict(entrega):
+    """Misma forma que EntregaParcialLoteSerializer, sin instanciar un serializer por entrega"""
+    return {
+        'id': entrega.id,
+        'lote': entrega.lote_id,
+        'numero_entrega': entrega.numero_entrega,
+        'fecha_entrega': _CAMPO_FECHA.to_representation(entrega.fecha_entrega),
+        'cantidad_entregada': entrega.cantidad_entregada,
+        'estado_entrega': entrega.estado_entrega_id,
+        'estado_entrega_info': {
+            'id': entrega.estado_entrega.id,
+            'codigo': entrega.estado_entrega.codigo,
+            'nombre': entrega.estado_entrega.nombre,
+            'color': entrega.estado_entrega.color
+        },
+        'observaciones': entrega.observaciones,
+        'created_at': _CAMPO_FECHA_HORA.to_representation(entrega.created_at),
+        'created_by': entrega.created_by_id,
+        'created_by_nombre': entrega.created_by.nombre_completo if entrega.created_by else None
+    }
+
+
+# Documentación estática de la importación: se serializa una sola vez al cargar el módulo
+PLANTILLA_IMPORTACION = {
+    'deteccion_automatica': {
+        'descripcion': 'El sistema detecta automáticamente el tipo de material basado en el modelo seleccionado',
+        'flujos': {
+            'materiales_unicos': 'ONUs y equipos con identificadores únicos (MAC, GPON, etc.)',
+            'materiales_no_unicos': 'Cables, conectores, materiales por cantidad'
+        }
+    },
+    'materiales_unicos': {
+        'descripcion': 'Para equipos únicos como ONUs',
+        'deteccion': 'Modelo con tipo_material.es_unico = True',
+        'plantilla': {
+            'columnas_requeridas': ['GPON_SN', 'MAC'],
+            'columnas_opcionales': ['D_SN'],
+            'formato_mac': 'XX:XX:XX:XX:XX:XX (mayúsculas, separado por :)',
+            'formato_gpon': 'Mínimo 8 caracteres (ej: HWTC12345678)',
+            'formato_d_sn': 'Mínimo 6 caracteres si se proporciona (OPCIONAL)',
+            'ejemplo': {
+                'GPON_SN': 'HWTC12345678',
+                'MAC': '00:11:22:33:44:55',
+                'D_SN': 'SN123456789 (OPCIONAL)'
+            }
+        },
+        'item_equipo_info': {
+            'descripcion': 'El código ITEM_EQUIPO se configura una vez para todo el lote',
+            'formato': '6-10 dígitos numéricos',
+            'ejemplo': '1234567890'
+        },
+        'limites': {
+            'max_filas': 1000,
+            'validaciones': 'MAC, GPON únicos en sistema y archivo'
+        }
+    },
+    'materiales_no_unicos': {
+        'descripción': 'Para cables, conectores, materiales por cantidad',
+        'deteccion': 'Modelo con tipo_material.es_unico = False',
+        'plantilla': {
+            'columnas_requeridas': ['CANTIDAD', 'ITEM_EQUIPO'],
+            'columnas_opcionales': ['OBSERVACIONES', 'LOTE_PROVEEDOR'],
+            'formato_cantidad': 'Número decimal positivo (ej: 100.5)',
+            'formato_item_equipo': '6-10 dígitos numéricos por fila',
+            'ejemplo': {
+                'CANTIDAD': 100,
+                'ITEM_EQUIPO': '1234567890',
+                'OBSERVACIONES': 'Cable fibra óptica monomodo SM',
+                'LOTE_PROVEEDOR': 'LOTE-2024-001'
+            }
+        },
+        'limites': {
+            'max_filas': 100,
+            'max_cantidad_por_fila': 10000,
+            'validaciones': 'Cantidad > 0, ITEM_EQUIPO numérico'
+        }
+    },
+    'formatos_archivo_soportados': [
+        {
+            'tipo': 'Excel',
+            'extension': '.xlsx',
+            'descripcion': 'Formato recomendado'
+        },
+        {
+            'tipo': 'CSV',
+            'extension': '.csv',
+            'descripcion': 'Separado por comas, codificación UTF-8'
+        }
+    ],
+    'instrucciones_generales': [
+        '1. El sistema detecta automáticamente si el modelo es único o no',
+        '2. Usar la plantilla correcta según el tipo detectado',
+        '3. No dejar filas vacías entre los datos',
+        '4. Verificar que todos los valores sean únicos donde corresponde',
+        '5. El ITEM_EQUIPO puede ser diferente por fila en materiales no únicos',
+        '6. Las observaciones son opcionales pero recomendadas',
+        '7. Validar siempre antes de importar usando validacion=true'
+    ]
+}
+_PLANTILLA_IMPORTACION_JSON = JSONRenderer().render(PLANTILLA_IMPORTACION)
+
+
 class ImportacionMasivaView(APIView):
     """View para importación masiva de materiales desde Excel/CSV - SOPORTE DUAL"""
     permission_classes = [IsAuthenticated]
@@ -787,7 +1015,7 @@ class ImportacionMasivaView(APIView):
 
     def post(self, request, *args, **kwargs):
         """Procesar archivo de importación masiva - DETECCIÓN AUTOMÁTICA DE TIPO"""
-        print("🔍 === INICIO IMPORTACION MASIVA DUAL ===")
+        logger.debug("🔍 === INICIO IMPORTACION MASIVA DUAL ===")
         try:
             # Obtener parámetros
             lote_id = request.data.get('lote_id')
@@ -797,35 +1025,43 @@ class ImportacionMasivaView(APIView):
             entrega_seleccionada = request.data.get('entrega_seleccionada')
             es_validacion = request.data.get('validacion', 'false').lower() == 'true'
 
-            print(f"🔍 DEBUG PARAMETROS RECIBIDOS:")
-            print(f"   lote_id: '{lote_id}' (tipo: {type(lote_id)})")
-            print(f"   modelo_id: '{modelo_id}' (tipo: {type(modelo_id)})")
-            print(f"   archivo: {archivo.name if archivo else 'None'}")
-            print(f"   numero_entrega: '{numero_entrega}' (tipo: {type(numero_entrega)})")
-            print(f"   entrega_seleccionada: '{entrega_seleccionada}' (tipo: {type(entrega_seleccionada)})")
-            print(f"   es_validacion: {es_validacion}")
+            logger.debug("🔍 DEBUG PARAMETROS RECIBIDOS:")
+            logger.debug("   lote_id: '%s' (tipo: %s)", lote_id, type(lote_id))
+            logger.debug("   modelo_id: '%s' (tipo: %s)", modelo_id, type(modelo_id))
+            logger.debug("   archivo: %s", archivo.name if archivo else 'None')
+            logger.debug("   numero_entrega: '%s' (tipo: %s)", numero_entrega, type(numero_entrega))
+            logger.debug("   entrega_seleccionada: '%s' (tipo: %s)", entrega_seleccionada, type(entrega_seleccionada))
+            logger.debug("   es_validacion: %s", es_validacion)
 
             # Validar parámetros requeridos básicos
             if not all([lote_id, modelo_id, archivo]):
-                print(f"❌ Faltan parámetros:")
-                print(f"   lote_id presente: {bool(lote_id)}")
-                print(f"   modelo_id presente: {bool(modelo_id)}")
-                print(f"   archivo presente: {bool(archivo)}")
+                logger.debug("❌ Faltan parámetros:")
+                logger.debug("   lote_id presente: %s", bool(lote_id))
+                logger.debug("   modelo_id presente: %s", bool(modelo_id))
+                logger.debug("   archivo presente: %s", bool(archivo))
                 return Response({
                     'success': False,
                     'error': 'Faltan parámetros requeridos: lote_id, modelo_id, archivo'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
+            # Rechazar archivos demasiado grandes sin llegar a leerlos
+            if archivo.size > TAMANO_MAXIMO_ARCHIVO:
+                return Response({
+                    'success': False,
+                    'error': 'El archivo no puede ser mayor a 5MB'
+                }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
             if entrega_seleccionada:
                 numero_entrega = entrega_seleccionada
-                print(f"   Usando entrega seleccionada: {numero_entrega}")
+                logger.debug("   Usando entrega seleccionada: %s", numero_entrega)
 
             # Validar que el lote y modelo existen
             try:
-                lote = Lote.objects.get(id=lote_id)
-                modelo = Modelo.objects.get(id=modelo_id)
-                print(f"✅ Lote encontrado: {lote.numero_lote}")
-                print(f"✅ Modelo encontrado: {modelo.nombre}")
+                # Relaciones que la importación consulta varias veces, en la misma consulta
+                lote = Lote.objects.select_related('tipo_ingreso', 'estado').get(id=lote_id)
+                modelo = Modelo.objects.select_related('tipo_material').get(id=modelo_id)
+                logger.debug("✅ Lote encontrado: %s", lote.numero_lote)
+                logger.debug("✅ Modelo encontrado: %s", modelo.nombre)
             except (Lote.DoesNotExist, Modelo.DoesNotExist):
                 return Response({
                     'success': False,
@@ -834,95 +1070,76 @@ class ImportacionMasivaView(APIView):
 
             # ✅ DETECCIÓN AUTOMÁTICA DEL TIPO DE MATERIAL
             es_material_unico = modelo.tipo_material.es_unico
-            print(f"🔍 TIPO DE MATERIAL DETECTADO:")
-            print(f"   Modelo: {modelo.nombre}")
-            print(f"   Tipo Material: {modelo.tipo_material.nombre} (código: {modelo.tipo_material.codigo})")
-            print(f"   Es Único: {es_material_unico}")
+            logger.debug("🔍 TIPO DE MATERIAL DETECTADO:")
+            logger.debug("   Modelo: %s", modelo.nombre)
+            logger.debug("   Tipo Material: %s (código: %s)", modelo.tipo_material.nombre, modelo.tipo_material.codigo)
+            logger.debug("   Es Único: %s", es_material_unico)
 
             if es_material_unico:
-                print("🔄 Procesando como MATERIAL ÚNICO (ONU)")
+                logger.debug("🔄 Procesando como MATERIAL ÚNICO (ONU)")
                 return self._procesar_materiales_unicos(
                     request, lote, modelo, archivo, numero_entrega, es_validacion
                 )
             else:
-                print("🔄 Procesando como MATERIAL NO ÚNICO (cantidad)")
+                logger.debug("🔄 Procesando como MATERIAL NO ÚNICO (cantidad)")
                 return self._procesar_materiales_no_unicos(
                     request, lote, modelo, archivo, numero_entrega, es_validacion
                 )
 
         except Exception as e:
-            print(f"💥 ERROR GENERAL: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("💥 ERROR GENERAL: %s", e)
             return Response({
                 'success': False,
                 'error': f'Error interno: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         finally:
-            print("🔍 === FIN IMPORTACION MASIVA DUAL ===")
+            logger.debug("🔍 === FIN IMPORTACION MASIVA DUAL ===")
 
     def _procesar_materiales_unicos(self, request, lote, modelo, archivo, numero_entrega, es_validacion):
         """Procesar materiales únicos (ONUs) - CÓDIGO ORIGINAL MEJORADO"""
-        print("🔍 === PROCESANDO MATERIALES ÚNICOS (ONUs) ===")
+        logger.debug("🔍 === PROCESANDO MATERIALES ÚNICOS (ONUs) ===")
 
         try:
             # Obtener ITEM_EQUIPO desde request
             item_equipo = request.data.get('item_equipo')
             item_equipo_str = str(item_equipo).strip() if item_equipo else ""
-            print(f"🔍 ITEM_EQUIPO procesado: '{item_equipo_str}' (length: {len(item_equipo_str)})")
+            logger.debug("🔍 ITEM_EQUIPO procesado: '%s' (length: %s)", item_equipo_str, len(item_equipo_str))
 
             # Validar formato ITEM_EQUIPO
-            if not re.match(r'^\d{6,10}$', item_equipo_str):
-                print(f"❌ ITEM_EQUIPO regex failed para: '{item_equipo_str}'")
+            if not item_equipo_valido(item_equipo_str):
+                logger.debug("❌ ITEM_EQUIPO regex failed para: '%s'", item_equipo_str)
                 return Response({
                     'success': False,
                     'error': f'ITEM_EQUIPO debe tener entre 6 y 10 dígitos numéricos. Recibido: "{item_equipo_str}"'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            print(f"✅ ITEM_EQUIPO válido: '{item_equipo_str}'")
+            logger.debug("✅ ITEM_EQUIPO válido: '%s'", item_equipo_str)
             item_equipo = item_equipo_str
 
-            # Verificar modelo Material
-            print("🔍 Verificando modelo Material...")
-            try:
-                total_materiales_antes = Material.objects.count()
-                materiales_lote_antes = Material.objects.filter(lote_id=lote.id).count()
-                print(f"📊 Materiales en sistema: {total_materiales_antes}")
-                print(f"📊 Materiales en lote {lote.id}: {materiales_lote_antes}")
-            except Exception as e:
-                print(f"❌ Error accediendo a Material: {e}")
-                return Response({
-                    'success': False,
-                    'error': 'Error interno: modelos no disponibles'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            columnas_requeridas = ['GPON_SN', 'MAC']
+            columnas_opcionales = ['D_SN']
 
-            # Procesar archivo
+            # Procesar archivo (solo las columnas usadas; una fila extra basta para detectar el exceso)
             try:
-                if archivo.name.endswith('.csv'):
-                    df = pd.read_csv(archivo)
-                elif archivo.name.endswith('.xlsx'):
-                    df = pd.read_excel(archivo)
-                else:
+                df = leer_archivo_importacion(archivo, columnas_requeridas + columnas_opcionales, 1001)
+                if df is None:
                     return Response({
                         'success': False,
                         'error': 'Formato de archivo no soportado. Use CSV o Excel (.xlsx)'
                     }, status=status.HTTP_400_BAD_REQUEST)
 
-                print(f"✅ Archivo leído: {len(df)} filas")
-                print(f"📝 Columnas disponibles: {list(df.columns)}")
+                logger.debug("✅ Archivo leído: %s filas", len(df))
+                logger.debug("📝 Columnas disponibles: %s", list(df.columns))
 
             except Exception as e:
-                print(f"💥 Error leyendo archivo: {str(e)}")
+                logger.debug("💥 Error leyendo archivo: %s", e)
                 return Response({
                     'success': False,
                     'error': f'Error al leer archivo: {str(e)}'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
             # ✅ VALIDAR COLUMNAS - D_SN AHORA OPCIONAL
-            columnas_requeridas = ['GPON_SN', 'MAC']
-            columnas_opcionales = ['D_SN']
-
             columnas_faltantes = [col for col in columnas_requeridas if col not in df.columns]
 
             if columnas_faltantes:
@@ -931,7 +1148,7 @@ class ImportacionMasivaView(APIView):
                     'error': f'Columnas faltantes: {", ".join(columnas_faltantes)}. Requeridas: {", ".join(columnas_requeridas)}. Opcionales: {", ".join(columnas_opcionales)}'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            print(f"✅ Columnas validadas. D_SN es opcional: {'D_SN' in df.columns}")
+            logger.debug("✅ Columnas validadas. D_SN es opcional: %s", 'D_SN' in df.columns)
 
             # Validar tamaño del archivo
             if len(df) > 1000:
@@ -940,91 +1157,74 @@ class ImportacionMasivaView(APIView):
                     'error': 'El archivo no puede tener más de 1000 filas'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # ✅ PROCESAR DATOS CON SN OPCIONAL
+            # ✅ PROCESAR DATOS CON SN OPCIONAL (validación vectorizada por columna)
+            macs = columna_como_texto(df, 'MAC').str.upper()
+            gpons = columna_como_texto(df, 'GPON_SN')
+            d_sns = columna_como_texto(df, 'D_SN')  # D_SN opcional - puede no existir la columna
+
+            # MAC Address - OBLIGATORIO con formato; se normaliza a ':' solo si el formato es válido
+            mac_ok = macs.str.match(PATRON_MAC)
+            macs = macs.where(~mac_ok, macs.str.replace('-', ':', regex=False))
+            mac_repetida = mac_ok & macs.where(mac_ok).duplicated()
+
+            # GPON Serial - OBLIGATORIO con formato
+            gpon_ok = gpons.str.len() >= 8
+            gpon_repetido = gpon_ok & gpons.where(gpon_ok).duplicated()
+
+            # ✅ D_SN - OPCIONAL con formato si se proporciona
+            dsn_ok = d_sns.str.len() >= 6
+            dsn_repetido = dsn_ok & d_sns.where(dsn_ok).duplicated()
+
+            # ✅ DUPLICADOS EN BASE DE DATOS: una sola consulta para las tres columnas (solo si no es validación)
+            macs_existentes = set()
+            gpons_existentes = set()
+            dsns_existentes = set()
+            if not es_validacion:
+                macs_existentes, gpons_existentes, dsns_existentes = Material.identificadores_existentes(
+                    macs[mac_ok], gpons[gpon_ok], d_sns[dsn_ok]
+                )
+
             equipos_validos = []
             errores = []
-            macs_duplicados = set()
-            gpon_duplicados = set()
-            dsn_duplicados = set()
 
-            for index, row in df.iterrows():
+            for index, mac, gpon_sn, d_sn, mac_valida, mac_dup, gpon_valido, gpon_dup, dsn_valido, dsn_dup in zip(
+                df.index, macs, gpons, d_sns, mac_ok, mac_repetida, gpon_ok, gpon_repetido, dsn_ok, dsn_repetido
+            ):
                 fila_num = index + 2
                 errores_fila = []
 
-                # ✅ EXTRAER DATOS - D_SN OPCIONAL
-                mac = str(row['MAC']).strip().upper() if pd.notna(row['MAC']) else ''
-                gpon_sn = str(row['GPON_SN']).strip() if pd.notna(row['GPON_SN']) else ''
-
-                # D_SN opcional - puede no existir la columna o estar vacío
-                d_sn = ''
-                if 'D_SN' in df.columns and 'D_SN' in row and pd.notna(row['D_SN']):
-                    d_sn = str(row['D_SN']).strip()
-
-                # Crear datos del equipo
-                equipo_data = {
-                    'mac_address': mac,
-                    'gpon_serial': gpon_sn,
-                    'serial_manufacturer': d_sn,  # ✅ Puede estar vacío
-                    'codigo_item_equipo': item_equipo,
-                    'fila': fila_num
-                }
-
-                # ✅ VALIDACIONES CON FORMATOS MANTENIDOS
-
-                # MAC Address - OBLIGATORIO con formato
                 if not mac:
                     errores_fila.append('MAC Address es requerido')
-                else:
-                    # Validar formato MAC
-                    mac_pattern = r'^([0-9A-F]{2}[:-]){5}([0-9A-F]{2})$'
-                    if not re.match(mac_pattern, mac):
-                        errores_fila.append('Formato de MAC inválido. Use XX:XX:XX:XX:XX:XX')
-                    else:
-                        # Normalizar MAC
-                        mac = mac.replace('-', ':')
-                        equipo_data['mac_address'] = mac
-
-                        # Verificar duplicados en archivo
-                        if mac in macs_duplicados:
-                            errores_fila.append('MAC duplicada en el archivo')
-                        else:
-                            macs_duplicados.add(mac)
+                elif not mac_valida:
+                    errores_fila.append('Formato de MAC inválido. Use XX:XX:XX:XX:XX:XX')
+                elif mac_dup:
+                    errores_fila.append('MAC duplicada en el archivo')
 
-                # GPON Serial - OBLIGATORIO con formato
                 if not gpon_sn:
                     errores_fila.append('GPON Serial es requerido')
-                elif len(gpon_sn) < 8:
+                elif not gpon_valido:
                     errores_fila.append('GPON Serial debe tener al menos 8 caracteres')
-                else:
-                    # Verificar duplicados en archivo
-                    if gpon_sn in gpon_duplicados:
-                        errores_fila.append('GPON Serial duplicado en el archivo')
-                    else:
-                        gpon_duplicados.add(gpon_sn)
+                elif gpon_dup:
+                    errores_fila.append('GPON Serial duplicado en el archivo')
 
-                # ✅ D_SN - OPCIONAL con formato si se proporciona
                 if d_sn:  # Solo validar si tiene valor
-                    if len(d_sn) < 6:
+                    if not dsn_valido:
                         errores_fila.append('D-SN debe tener al menos 6 caracteres si se proporciona')
-                    else:
-                        # Verificar duplicados en archivo
-                        if d_sn in dsn_duplicados:
-                            errores_fila.append('D-SN duplicado en el archivo')
-                        else:
-                            dsn_duplicados.add(d_sn)
+                    elif dsn_dup:
+                        errores_fila.append('D-SN duplicado en el archivo')
 
                 # ✅ VERIFICAR DUPLICADOS EN BASE DE DATOS (solo si no es validación)
                 if not errores_fila and not es_validacion:
                     # MAC siempre verificar (obligatorio)
-                    if Material.objects.filter(mac_address=mac).exists():
+                    if mac in macs_existentes:
                         errores_fila.append('MAC ya existe en el sistema')
 
                     # GPON siempre verificar (obligatorio)
-                    if Material.objects.filter(gpon_serial=gpon_sn).exists():
+                    if gpon_sn in gpons_existentes:
                         errores_fila.append('GPON Serial ya existe en el sistema')
 
                     # D_SN solo verificar si tiene valor
-                    if d_sn and Material.objects.filter(serial_manufacturer=d_sn).exists():
+                    if d_sn and d_sn in dsns_existentes:
                         errores_fila.append('D-SN ya existe en el sistema')
 
                 # Registrar errores o equipos válidos
@@ -1037,7 +1237,13 @@ class ImportacionMasivaView(APIView):
                         'errores': errores_fila
                     })
                 else:
-                    equipos_validos.append(equipo_data)
+                    equipos_validos.append({
+                        'mac_address': mac,
+                        'gpon_serial': gpon_sn,
+                        'serial_manufacturer': d_sn,  # ✅ Puede estar vacío
+                        'codigo_item_equipo': item_equipo,
+                        'fila': fila_num
+                    })
 
             # Preparar resultado
             resultado = {
@@ -1050,10 +1256,10 @@ class ImportacionMasivaView(APIView):
                 'tipo_material': 'UNICO'
             }
 
-            print(f"📊 Procesamiento completado:")
-            print(f"   Total filas: {len(df)}")
-            print(f"   Equipos válidos: {len(equipos_validos)}")
-            print(f"   Errores: {len(errores)}")
+            logger.debug("📊 Procesamiento completado:")
+            logger.debug("   Total filas: %s", len(df))
+            logger.debug("   Equipos válidos: %s", len(equipos_validos))
+            logger.debug("   Errores: %s", len(errores))
 
             # Si es solo validación, devolver preview
             if es_validacion:
@@ -1094,11 +1300,10 @@ class ImportacionMasivaView(APIView):
                     equipos_disponibles = entrega_parcial.cantidad_entregada - materiales_actuales
                     equipos_a_importar = len(equipos_validos)
 
-                    print(f"🔍 VERIFICACION PREVIA:")
-                    print(
-                        f"   Entrega #{numero_entrega}: {materiales_actuales}/{entrega_parcial.cantidad_entregada} equipos")
-                    print(f"   Capacidad disponible: {equipos_disponibles} equipos")
-                    print(f"   Intentando importar: {equipos_a_importar} equipos")
+                    logger.debug("🔍 VERIFICACION PREVIA:")
+                    logger.debug("   Entrega #%s: %s/%s equipos", numero_entrega, materiales_actuales, entrega_parcial.cantidad_entregada)
+                    logger.debug("   Capacidad disponible: %s equipos", equipos_disponibles)
+                    logger.debug("   Intentando importar: %s equipos", equipos_a_importar)
 
                     if equipos_a_importar > equipos_disponibles:
                         return Response({
@@ -1121,115 +1326,103 @@ class ImportacionMasivaView(APIView):
 
             # ✅ PROCEDER CON LA IMPORTACIÓN REAL
             with transaction.atomic():
-                importados = 0
                 errores_importacion = []
 
-                print(f"🔍 Iniciando importación de {len(equipos_validos)} equipos")
+                logger.debug("🔍 Iniciando importación de %s equipos", len(equipos_validos))
 
                 # Obtener referencias necesarias
                 try:
-                    tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
-                    estado_nuevo = EstadoMaterialONU.objects.get(codigo='NUEVO', activo=True)
-                    tipo_ingreso_nuevo = TipoIngreso.objects.get(codigo='NUEVO', activo=True)
+                    tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
+                    estado_nuevo = obtener_por_codigo(EstadoMaterialONU, 'NUEVO')
+                    tipo_ingreso_nuevo = obtener_por_codigo(TipoIngreso, 'NUEVO')
 
-                    print(f"✅ Referencias obtenidas:")
-                    print(f"   Tipo ONU: {tipo_onu}")
-                    print(f"   Estado NUEVO: {estado_nuevo}")
-                    print(f"   Tipo ingreso NUEVO: {tipo_ingreso_nuevo}")
+                    logger.debug("✅ Referencias obtenidas:")
+                    logger.debug("   Tipo ONU: %s", tipo_onu)
+                    logger.debug("   Estado NUEVO: %s", estado_nuevo)
+                    logger.debug("   Tipo ingreso NUEVO: %s", tipo_ingreso_nuevo)
 
                 except (TipoMaterial.DoesNotExist, EstadoMaterialONU.DoesNotExist, TipoIngreso.DoesNotExist) as e:
-                    print(f"❌ Error obteniendo referencias: {e}")
+                    logger.debug("❌ Error obteniendo referencias: %s", e)
                     return Response({
                         'success': False,
                         'error': f'Configuración incompleta: {str(e)}'
                     }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-                # ✅ CREAR CADA MATERIAL
-                for index, equipo in enumerate(equipos_validos):
-                    try:
-                        print(f"📦 Creando material {index + 1}/{len(equipos_validos)}: MAC {equipo['mac_address']}")
-
-                        material = Material.objects.create(
-                            # Relaciones básicas
-                            tipo_material=tipo_onu,
-                            modelo=modelo,
-                            lote=lote,
-
-                            # ✅ DATOS DEL EQUIPO ONU - SN OPCIONAL
-                            mac_address=equipo['mac_address'],
-                            gpon_serial=equipo['gpon_serial'],
-                            serial_manufacturer=equipo['serial_manufacturer'] or None,  # ✅ NULL si vacío
-                            codigo_item_equipo=equipo['codigo_item_equipo'],
+                # ✅ CREAR MATERIALES: un INSERT por cada 500 equipos en lugar de uno por fila
+                # bulk_create no llama a save(): código interno y estado se asignan aquí
+                # (la MAC ya viene normalizada de la validación)
+                observaciones = f"Importación masiva - Entrega #{numero_entrega}" if numero_entrega else "Importación masiva"
+                codigos = Material.generar_codigos_internos(True, len(equipos_validos))
+                materiales = [
+                    Material(
+                        codigo_interno=codigo,
+
+                        # Relaciones básicas
+                        tipo_material=tipo_onu,
+                        modelo=modelo,
+                        lote=lote,
 
-                            # ✅ NÚMERO DE ENTREGA PARCIAL
-                            numero_entrega_parcial=numero_entrega,
+                        # ✅ DATOS DEL EQUIPO ONU - SN OPCIONAL
+                        mac_address=equipo['mac_address'],
+                        gpon_serial=equipo['gpon_serial'],
+                        serial_manufacturer=equipo['serial_manufacturer'] or None,  # ✅ NULL si vacío
+                        codigo_item_equipo=equipo['codigo_item_equipo'],
 
-                            # Ubicación y estado
-                            almacen_actual=lote.almacen_destino,
-                            estado_onu=estado_nuevo,
+                        # ✅ NÚMERO DE ENTREGA PARCIAL
+                        numero_entrega_parcial=numero_entrega,
 
-                            # Control de origen
-                            es_nuevo=True,
-                            tipo_origen=tipo_ingreso_nuevo,
+                        # Ubicación y estado
+                        almacen_actual_id=lote.almacen_destino_id,
+                        estado_onu=estado_nuevo,
 
-                            # Cantidad (1 para equipos únicos)
-                            cantidad=1.00,
+                        # Control de origen
+                        es_nuevo=True,
+                        tipo_origen=tipo_ingreso_nuevo,
 
-                            # Observaciones
-                            observaciones=f"Importación masiva - Entrega #{numero_entrega}" if numero_entrega else "Importación masiva"
-                        )
+                        # Cantidad (1 para equipos únicos)
+                        cantidad=1.00,
 
-                        print(f"✅ Material creado: ID={material.id}, Código={material.codigo_interno}")
-                        importados += 1
+                        observaciones=observaciones
+                    )
+                    for equipo, codigo in zip(equipos_validos, codigos)
+                ]
+                try:
+                    Material.objects.bulk_create(materiales, batch_size=500)
+                except IntegrityError as e:
+                    # Otra operación registró alguno de estos equipos entre la validación y el INSERT
+                    logger.warning("Importación masiva en lote %s rechazada por duplicados: %s", lote.numero_lote, e)
+                    transaction.set_rollback(True)
+                    return Response({
+                        'success': False,
+                        'error': 'Algunos equipos fueron registrados por otra operación durante la importación. Vuelva a validar el archivo.'
+                    }, status=status.HTTP_409_CONFLICT)
+                importados = len(materiales)
 
-                    except Exception as e:
-                        error_msg = f"Error creando material MAC {equipo['mac_address']}: {str(e)}"
-                        print(f"❌ {error_msg}")
-                        errores_importacion.append({
-                            'mac': equipo['mac_address'],
-                            'gpon': equipo['gpon_serial'],
-                            'd_sn': equipo.get('serial_manufacturer', ''),
-                            'error': str(e)
-                        })
-                        continue
-
-                print(f"🎯 Importación completada: {importados} materiales creados")
+                logger.info("Importación masiva en lote %s: %s de %s equipos creados", lote.numero_lote, importados, len(df))
 
                 # ✅ CREAR O ACTUALIZAR ENTREGA PARCIAL AUTOMÁTICAMENTE
                 if importados > 0:
                     try:
-                        print(f"📦 Procesando entrega parcial...")
+                        logger.debug("📦 Procesando entrega parcial...")
 
                         if numero_entrega:
                             # Caso: Se seleccionó una entrega específica
-                            print(f"🔍 Actualizando entrega #{numero_entrega} seleccionada...")
+                            logger.debug("🔍 Actualizando entrega #%s seleccionada...", numero_entrega)
 
-                            try:
-                                entrega_parcial = EntregaParcialLote.objects.get(
-                                    lote=lote,
-                                    numero_entrega=int(numero_entrega)
-                                )
+                            # La entrega ya se obtuvo (y validó) al verificar la capacidad
+                            nueva_observacion = f"Importados {importados} equipos el {timezone.now().date()}"
+                            if entrega_parcial.observaciones:
+                                entrega_parcial.observaciones += f" | {nueva_observacion}"
+                            else:
+                                entrega_parcial.observaciones = nueva_observacion
 
-                                # Actualizar observaciones
-                                nueva_observacion = f"Importados {importados} equipos el {timezone.now().date()}"
-                                if entrega_parcial.observaciones:
-                                    entrega_parcial.observaciones += f" | {nueva_observacion}"
-                                else:
-                                    entrega_parcial.observaciones = nueva_observacion
+                            entrega_parcial.save(update_fields=['observaciones'])
 
-                                entrega_parcial.save()
-
-                                print(f"✅ Entrega #{numero_entrega} actualizada exitosamente")
-
-                            except EntregaParcialLote.DoesNotExist:
-                                return Response({
-                                    'success': False,
-                                    'error': f'La entrega #{numero_entrega} no existe'
-                                }, status=status.HTTP_404_NOT_FOUND)
+                            logger.debug("✅ Entrega #%s actualizada exitosamente", numero_entrega)
 
                         else:
                             # Caso: Crear nueva entrega automática
-                            print(f"🆕 Creando nueva entrega automática...")
+                            logger.debug("🆕 Creando nueva entrega automática...")
 
                             # Obtener el próximo número de entrega
                             ultima_entrega = EntregaParcialLote.objects.filter(
@@ -1239,7 +1432,7 @@ class ImportacionMasivaView(APIView):
                             siguiente_numero = (ultima_entrega.numero_entrega + 1) if ultima_entrega else 1
 
                             try:
-                                estado_activo = EstadoLote.objects.get(codigo='ACTIVO', activo=True)
+                                estado_activo = obtener_por_codigo(EstadoLote, 'ACTIVO')
                             except EstadoLote.DoesNotExist:
                                 # Usar el primer estado disponible como fallback
                                 estado_activo = EstadoLote.objects.filter(activo=True).first()
@@ -1259,10 +1452,12 @@ class ImportacionMasivaView(APIView):
                                 numero_entrega_parcial__isnull=True
                             ).update(numero_entrega_parcial=siguiente_numero)
 
-                            print(f"✅ Nueva entrega #{siguiente_numero} creada con {importados} equipos")
+                            logger.debug("✅ Nueva entrega #%s creada con %s equipos", siguiente_numero, importados)
 
                     except Exception as e:
-                        print(f"⚠️ Error procesando entrega parcial: {e}")
+                        logger.debug("⚠️ Error procesando entrega parcial: %s", e)
+                        # Todo o nada: descartar también los materiales ya insertados
+                        transaction.set_rollback(True)
                         return Response({
                             'success': False,
                             'error': f'Error procesando entrega parcial: {str(e)}'
@@ -1270,47 +1465,42 @@ class ImportacionMasivaView(APIView):
 
                 # ✅ ACTUALIZAR ESTADO DEL LOTE BASADO EN ENTREGAS REALES
                 try:
-                    print(f"📊 Actualizando estado del lote...")
+                    logger.debug("📊 Actualizando estado del lote...")
 
                     # Calcular total entregado basado en entregas parciales
                     total_entregado_entregas = EntregaParcialLote.objects.filter(
                         lote=lote
                     ).aggregate(total=Sum('cantidad_entregada'))['total'] or 0
 
-                    print(f"📊 Total en entregas parciales: {total_entregado_entregas}/{lote.cantidad_total}")
+                    logger.debug("📊 Total en entregas parciales: %s/%s", total_entregado_entregas, lote.cantidad_total)
 
                     # Actualizar estado según el progreso real
                     if total_entregado_entregas >= lote.cantidad_total:
-                        estado_completa = EstadoLote.objects.get(codigo='RECEPCION_COMPLETA', activo=True)
+                        estado_completa = obtener_por_codigo(EstadoLote, 'RECEPCION_COMPLETA')
                         lote.estado = estado_completa
-                        print(f"✅ Lote completado: {estado_completa.nombre}")
+                        logger.debug("✅ Lote completado: %s", estado_completa.nombre)
                     elif total_entregado_entregas > 0:
-                        estado_parcial = EstadoLote.objects.get(codigo='RECEPCION_PARCIAL', activo=True)
+                        estado_parcial = obtener_por_codigo(EstadoLote, 'RECEPCION_PARCIAL')
                         lote.estado = estado_parcial
-                        print(f"✅ Lote parcial: {estado_parcial.nombre}")
+                        logger.debug("✅ Lote parcial: %s", estado_parcial.nombre)
                     else:
                         # Mantener estado actual si no hay entregas
-                        print(
-                            f"ℹ️ Sin entregas registradas, manteniendo estado: {lote.estado.nombre if lote.estado else 'Sin estado'}")
+                        logger.debug("ℹ️ Sin entregas registradas, manteniendo estado: %s", lote.estado.nombre if lote.estado else 'Sin estado')
 
-                    lote.save()
-                    print(f"✅ Estado del lote actualizado: {lote.estado.nombre}")
+                    # Un solo UPDATE del estado; update() no emite post_save, se invalida a mano
+                    Lote.objects.filter(pk=lote.pk).update(estado=lote.estado, updated_at=timezone.now())
+                    invalidar_cache_lote(lote.pk)
+                    logger.debug("✅ Estado del lote actualizado: %s", lote.estado.nombre)
 
                 except EstadoLote.DoesNotExist as e:
-                    print(f"⚠️ Estado de lote no encontrado: {e}")
+                    logger.debug("⚠️ Estado de lote no encontrado: %s", e)
                 except Exception as e:
-                    print(f"⚠️ Error actualizando estado del lote: {e}")
+                    logger.debug("⚠️ Error actualizando estado del lote: %s", e)
 
                 # Actualizar estadísticas del resultado
                 resultado['importados'] = importados
                 resultado['errores_importacion'] = errores_importacion
 
-            # Verificar resultados finales
-            total_materiales_despues = Material.objects.count()
-            materiales_lote_despues = Material.objects.filter(lote_id=lote.id).count()
-            print(f"📊 Materiales en sistema después: {total_materiales_despues}")
-            print(f"📊 Materiales en lote después: {materiales_lote_despues}")
-
             # ✅ RESPUESTA EXITOSA
             return Response({
                 'success': True,
@@ -1320,9 +1510,7 @@ class ImportacionMasivaView(APIView):
             })
 
         except Exception as e:
-            print(f"💥 ERROR EN MATERIALES ÚNICOS: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("💥 ERROR EN MATERIALES ÚNICOS: %s", e)
             return Response({
                 'success': False,
                 'error': f'Error procesando materiales únicos: {str(e)}'
@@ -1330,35 +1518,32 @@ class ImportacionMasivaView(APIView):
 
     def _procesar_materiales_no_unicos(self, request, lote, modelo, archivo, numero_entrega, es_validacion):
         """Procesar materiales no únicos (cables, conectores, etc.) - NUEVO FLUJO"""
-        print("🔍 === PROCESANDO MATERIALES NO ÚNICOS (CANTIDAD) ===")
+        logger.debug("🔍 === PROCESANDO MATERIALES NO ÚNICOS (CANTIDAD) ===")
 
         try:
-            # Procesar archivo
+            columnas_requeridas = ['CANTIDAD', 'ITEM_EQUIPO']
+            columnas_opcionales = ['OBSERVACIONES', 'LOTE_PROVEEDOR']
+
+            # Procesar archivo (solo las columnas usadas; una fila extra basta para detectar el exceso)
             try:
-                if archivo.name.endswith('.csv'):
-                    df = pd.read_csv(archivo)
-                elif archivo.name.endswith('.xlsx'):
-                    df = pd.read_excel(archivo)
-                else:
+                df = leer_archivo_importacion(archivo, columnas_requeridas + columnas_opcionales, 101)
+                if df is None:
                     return Response({
                         'success': False,
                         'error': 'Formato de archivo no soportado. Use CSV o Excel (.xlsx)'
                     }, status=status.HTTP_400_BAD_REQUEST)
 
-                print(f"✅ Archivo leído: {len(df)} filas")
-                print(f"📝 Columnas disponibles: {list(df.columns)}")
+                logger.debug("✅ Archivo leído: %s filas", len(df))
+                logger.debug("📝 Columnas disponibles: %s", list(df.columns))
 
             except Exception as e:
-                print(f"💥 Error leyendo archivo: {str(e)}")
+                logger.debug("💥 Error leyendo archivo: %s", e)
                 return Response({
                     'success': False,
                     'error': f'Error al leer archivo: {str(e)}'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
             # ✅ VALIDAR COLUMNAS PARA MATERIALES NO ÚNICOS
-            columnas_requeridas = ['CANTIDAD', 'ITEM_EQUIPO']
-            columnas_opcionales = ['OBSERVACIONES', 'LOTE_PROVEEDOR']
-
             columnas_faltantes = [col for col in columnas_requeridas if col not in df.columns]
 
             if columnas_faltantes:
@@ -1367,7 +1552,7 @@ class ImportacionMasivaView(APIView):
                     'error': f'Para materiales no únicos se requieren las columnas: {", ".join(columnas_requeridas)}. Faltantes: {", ".join(columnas_faltantes)}. Opcionales: {", ".join(columnas_opcionales)}'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            print(f"✅ Columnas validadas para materiales no únicos")
+            logger.debug("✅ Columnas validadas para materiales no únicos")
 
             # Validar tamaño del archivo
             if len(df) > 100:
@@ -1381,30 +1566,31 @@ class ImportacionMasivaView(APIView):
             errores = []
             cantidad_total_calculada = 0
 
-            for index, row in df.iterrows():
+            # Extraer y limpiar datos por columna (sin iterrows)
+            cantidades_texto = df['CANTIDAD']
+            cantidades = pd.to_numeric(cantidades_texto, errors='coerce')
+            cantidades_invalidas = cantidades.isna() & cantidades_texto.notna()
+            cantidades = cantidades.fillna(0)
+            items = columna_como_texto(df, 'ITEM_EQUIPO')
+            observaciones_col = columna_como_texto(df, 'OBSERVACIONES')
+            lotes_proveedor = columna_como_texto(df, 'LOTE_PROVEEDOR')
+
+            for index, cantidad, cantidad_invalida, item_equipo, observaciones, lote_proveedor in zip(
+                    df.index, cantidades, cantidades_invalidas, items, observaciones_col, lotes_proveedor):
                 fila_num = index + 2
                 errores_fila = []
 
-                # Extraer datos
-                try:
-                    cantidad = float(row['CANTIDAD']) if pd.notna(row['CANTIDAD']) else 0
-                    item_equipo = str(row['ITEM_EQUIPO']).strip() if pd.notna(row['ITEM_EQUIPO']) else ''
-                    observaciones = str(row.get('OBSERVACIONES', '')).strip() if pd.notna(
-                        row.get('OBSERVACIONES', '')) else ''
-                    lote_proveedor = str(row.get('LOTE_PROVEEDOR', '')).strip() if pd.notna(
-                        row.get('LOTE_PROVEEDOR', '')) else ''
-                except Exception as e:
-                    errores_fila.append(f'Error procesando datos: {str(e)}')
-
                 # Validaciones
-                if cantidad <= 0:
+                if cantidad_invalida:
+                    errores_fila.append('CANTIDAD debe ser numérica')
+                elif cantidad <= 0:
                     errores_fila.append('CANTIDAD debe ser mayor a 0')
                 elif cantidad > 10000:  # Límite razonable
                     errores_fila.append('CANTIDAD no puede ser mayor a 10,000')
 
                 if not item_equipo:
                     errores_fila.append('ITEM_EQUIPO es requerido')
-                elif not re.match(r'^\d{6,10}$', item_equipo):
+                elif not item_equipo_valido(item_equipo):
                     errores_fila.append('ITEM_EQUIPO debe tener entre 6 y 10 dígitos numéricos')
 
                 # Crear datos del lote de material
@@ -1421,8 +1607,8 @@ class ImportacionMasivaView(APIView):
                 else:
                     errores.append({
                         'fila': fila_num,
-                        'cantidad': cantidad if 'cantidad' in locals() else 'N/A',
-                        'item_equipo': item_equipo if 'item_equipo' in locals() else 'N/A',
+                        'cantidad': cantidad,
+                        'item_equipo': item_equipo,
                         'errores': errores_fila
                     })
 
@@ -1436,11 +1622,11 @@ class ImportacionMasivaView(APIView):
                 'tipo_material': 'NO_UNICO'
             }
 
-            print(f"📊 Procesamiento completado:")
-            print(f"   Total filas: {len(df)}")
-            print(f"   Lotes válidos: {len(lotes_validos)}")
-            print(f"   Cantidad total: {cantidad_total_calculada}")
-            print(f"   Errores: {len(errores)}")
+            logger.debug("📊 Procesamiento completado:")
+            logger.debug("   Total filas: %s", len(df))
+            logger.debug("   Lotes válidos: %s", len(lotes_validos))
+            logger.debug("   Cantidad total: %s", cantidad_total_calculada)
+            logger.debug("   Errores: %s", len(errores))
 
             # Si es solo validación, devolver preview
             if es_validacion:
@@ -1466,11 +1652,9 @@ class ImportacionMasivaView(APIView):
 
             # ✅ PROCEDER CON LA IMPORTACIÓN REAL DE MATERIALES NO ÚNICOS
             with transaction.atomic():
-                importados = 0
-                cantidad_total_importada = 0
                 errores_importacion = []
 
-                print(f"🔍 Iniciando importación de {len(lotes_validos)} lotes de materiales")
+                logger.debug("🔍 Iniciando importación de %s lotes de materiales", len(lotes_validos))
 
                 # Obtener referencias necesarias
                 try:
@@ -1482,96 +1666,89 @@ class ImportacionMasivaView(APIView):
                     if not tipo_material.es_unico:
                         try:
                             from ..models import EstadoMaterialGeneral
-                            estado_disponible = EstadoMaterialGeneral.objects.get(codigo='DISPONIBLE', activo=True)
+                            estado_disponible = obtener_por_codigo(EstadoMaterialGeneral, 'DISPONIBLE')
                         except ImportError:
-                            print("⚠️ EstadoMaterialGeneral no disponible")
+                            logger.debug("⚠️ EstadoMaterialGeneral no disponible")
                         except:
-                            print("⚠️ Estado DISPONIBLE no encontrado para materiales generales")
+                            logger.debug("⚠️ Estado DISPONIBLE no encontrado para materiales generales")
 
                     tipo_ingreso = lote.tipo_ingreso
 
-                    print(f"✅ Referencias obtenidas:")
-                    print(f"   Tipo Material: {tipo_material}")
-                    print(f"   Estado disponible: {estado_disponible}")
-                    print(f"   Tipo ingreso: {tipo_ingreso}")
+                    logger.debug("✅ Referencias obtenidas:")
+                    logger.debug("   Tipo Material: %s", tipo_material)
+                    logger.debug("   Estado disponible: %s", estado_disponible)
+                    logger.debug("   Tipo ingreso: %s", tipo_ingreso)
 
                 except Exception as e:
-                    print(f"❌ Error obteniendo referencias: {e}")
+                    logger.debug("❌ Error obteniendo referencias: %s", e)
                     return Response({
                         'success': False,
                         'error': f'Configuración incompleta: {str(e)}'
                     }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-                # ✅ CREAR CADA MATERIAL POR CANTIDAD
-                for index, lote_material in enumerate(lotes_validos):
-                    try:
-                        print(
-                            f"📦 Creando material {index + 1}/{len(lotes_validos)}: {lote_material['cantidad']} {modelo.unidad_medida.simbolo if modelo.unidad_medida else 'unidades'}")
-
-                        # Preparar observaciones
-                        observaciones_completas = f"Importación masiva - {lote_material['observaciones']}" if \
-                        lote_material['observaciones'] else "Importación masiva"
-                        if lote_material['lote_proveedor']:
-                            observaciones_completas += f" | Lote proveedor: {lote_material['lote_proveedor']}"
-                        if numero_entrega:
-                            observaciones_completas += f" | Entrega #{numero_entrega}"
-
-                        material = Material.objects.create(
-                            # Relaciones básicas
-                            tipo_material=tipo_material,
-                            modelo=modelo,
-                            lote=lote,
+                # ✅ CREAR MATERIALES POR CANTIDAD: un INSERT por cada 500 filas
+                # bulk_create no llama a save(): el código interno y el estado se asignan aquí
+                es_nuevo = lote.tipo_ingreso.codigo == 'NUEVO' if lote.tipo_ingreso else True
+                codigos = Material.generar_codigos_internos(False, len(lotes_validos))
+                materiales = []
+                for lote_material, codigo in zip(lotes_validos, codigos):
+                    # Preparar observaciones
+                    observaciones_completas = f"Importación masiva - {lote_material['observaciones']}" if \
+                    lote_material['observaciones'] else "Importación masiva"
+                    if lote_material['lote_proveedor']:
+                        observaciones_completas += f" | Lote proveedor: {lote_material['lote_proveedor']}"
+                    if numero_entrega:
+                        observaciones_completas += f" | Entrega #{numero_entrega}"
+
+                    materiales.append(Material(
+                        codigo_interno=codigo,
+
+                        # Relaciones básicas
+                        tipo_material=tipo_material,
+                        modelo=modelo,
+                        lote=lote,
 
-                            # ✅ DATOS PARA MATERIAL NO ÚNICO
-                            codigo_item_equipo=lote_material['codigo_item_equipo'],
-                            cantidad=lote_material['cantidad'],
+                        # ✅ DATOS PARA MATERIAL NO ÚNICO
+                        codigo_item_equipo=lote_material['codigo_item_equipo'],
+                        cantidad=lote_material['cantidad'],
 
-                            # ✅ NÚMERO DE ENTREGA PARCIAL
-                            numero_entrega_parcial=numero_entrega,
+                        # ✅ NÚMERO DE ENTREGA PARCIAL
+                        numero_entrega_parcial=numero_entrega,
 
-                            # Ubicación y estado
-                            almacen_actual=lote.almacen_destino,
-                            estado_general=estado_disponible,
+                        # Ubicación y estado
+                        almacen_actual_id=lote.almacen_destino_id,
+                        estado_general=estado_disponible,
 
-                            # Control de origen
-                            es_nuevo=lote.tipo_ingreso.codigo == 'NUEVO' if lote.tipo_ingreso else True,
-                            tipo_origen=tipo_ingreso,
+                        # Control de origen
+                        es_nuevo=es_nuevo,
+                        tipo_origen=tipo_ingreso,
 
-                            # Campos específicos para equipos únicos (vacíos para materiales no únicos)
-                            mac_address=None,
-                            gpon_serial=None,
-                            serial_manufacturer=None,
+                        # Campos específicos para equipos únicos (vacíos para materiales no únicos)
+                        mac_address=None,
+                        gpon_serial=None,
+                        serial_manufacturer=None,
 
-                            # Observaciones
-                            observaciones=observaciones_completas
-                        )
+                        # Observaciones
+                        observaciones=observaciones_completas
+                    ))
 
-                        print(
-                            f"✅ Material creado: ID={material.id}, Código={material.codigo_interno}, Cantidad={material.cantidad}")
-                        importados += 1
-                        cantidad_total_importada += lote_material['cantidad']
+                Material.objects.bulk_create(materiales, batch_size=500)
+                importados = len(materiales)
+                cantidad_total_importada = sum(lote_material['cantidad'] for lote_material in lotes_validos)
 
-                    except Exception as e:
-                        error_msg = f"Error creando material cantidad {lote_material['cantidad']}: {str(e)}"
-                        print(f"❌ {error_msg}")
-                        errores_importacion.append({
-                            'cantidad': lote_material['cantidad'],
-                            'item_equipo': lote_material['codigo_item_equipo'],
-                            'error': str(e)
-                        })
-                        continue
-
-                print(
-                    f"🎯 Importación completada: {importados} lotes de materiales creados, cantidad total: {cantidad_total_importada}")
+                logger.info(
+                    "Importación masiva en lote %s: %s de %s filas creadas, cantidad total %s",
+                    lote.numero_lote, importados, len(df), cantidad_total_importada
+                )
 
                 # ✅ CREAR O ACTUALIZAR ENTREGA PARCIAL PARA MATERIALES NO ÚNICOS
                 if importados > 0:
                     try:
-                        print(f"📦 Procesando entrega parcial para materiales no únicos...")
+                        logger.debug("📦 Procesando entrega parcial para materiales no únicos...")
 
                         if numero_entrega:
                             # Caso: Se seleccionó una entrega específica
-                            print(f"🔍 Actualizando entrega #{numero_entrega} seleccionada...")
+                            logger.debug("🔍 Actualizando entrega #%s seleccionada...", numero_entrega)
 
                             try:
                                 entrega_parcial = EntregaParcialLote.objects.get(
@@ -1586,11 +1763,12 @@ class ImportacionMasivaView(APIView):
                                 else:
                                     entrega_parcial.observaciones = nueva_observacion
 
-                                entrega_parcial.save()
+                                entrega_parcial.save(update_fields=['observaciones'])
 
-                                print(f"✅ Entrega #{numero_entrega} actualizada exitosamente")
+                                logger.debug("✅ Entrega #%s actualizada exitosamente", numero_entrega)
 
                             except EntregaParcialLote.DoesNotExist:
+                                transaction.set_rollback(True)
                                 return Response({
                                     'success': False,
                                     'error': f'La entrega #{numero_entrega} no existe'
@@ -1598,7 +1776,7 @@ class ImportacionMasivaView(APIView):
 
                         else:
                             # Caso: Crear nueva entrega automática
-                            print(f"🆕 Creando nueva entrega automática...")
+                            logger.debug("🆕 Creando nueva entrega automática...")
 
                             # Obtener el próximo número de entrega
                             ultima_entrega = EntregaParcialLote.objects.filter(
@@ -1608,7 +1786,7 @@ class ImportacionMasivaView(APIView):
                             siguiente_numero = (ultima_entrega.numero_entrega + 1) if ultima_entrega else 1
 
                             try:
-                                estado_activo = EstadoLote.objects.get(codigo='ACTIVO', activo=True)
+                                estado_activo = obtener_por_codigo(EstadoLote, 'ACTIVO')
                             except EstadoLote.DoesNotExist:
                                 estado_activo = EstadoLote.objects.filter(activo=True).first()
 
@@ -1628,11 +1806,12 @@ class ImportacionMasivaView(APIView):
                                 numero_entrega_parcial__isnull=True
                             ).update(numero_entrega_parcial=siguiente_numero)
 
-                            print(
-                                f"✅ Nueva entrega #{siguiente_numero} creada con cantidad total {cantidad_total_importada}")
+                            logger.debug("✅ Nueva entrega #%s creada con cantidad total %s", siguiente_numero, cantidad_total_importada)
 
                     except Exception as e:
-                        print(f"⚠️ Error procesando entrega parcial: {e}")
+                        logger.debug("⚠️ Error procesando entrega parcial: %s", e)
+                        # Todo o nada: descartar también los materiales ya insertados
+                        transaction.set_rollback(True)
                         return Response({
                             'success': False,
                             'error': f'Error procesando entrega parcial: {str(e)}'
@@ -1640,32 +1819,34 @@ class ImportacionMasivaView(APIView):
 
                 # ✅ ACTUALIZAR ESTADO DEL LOTE
                 try:
-                    print(f"📊 Actualizando estado del lote...")
+                    logger.debug("📊 Actualizando estado del lote...")
 
                     # Calcular total entregado basado en entregas parciales
                     total_entregado_entregas = EntregaParcialLote.objects.filter(
                         lote=lote
                     ).aggregate(total=Sum('cantidad_entregada'))['total'] or 0
 
-                    print(f"📊 Total en entregas parciales: {total_entregado_entregas}/{lote.cantidad_total}")
+                    logger.debug("📊 Total en entregas parciales: %s/%s", total_entregado_entregas, lote.cantidad_total)
 
                     # Actualizar estado según el progreso real
                     if total_entregado_entregas >= lote.cantidad_total:
-                        estado_completa = EstadoLote.objects.get(codigo='RECEPCION_COMPLETA', activo=True)
+                        estado_completa = obtener_por_codigo(EstadoLote, 'RECEPCION_COMPLETA')
                         lote.estado = estado_completa
-                        print(f"✅ Lote completado: {estado_completa.nombre}")
+                        logger.debug("✅ Lote completado: %s", estado_completa.nombre)
                     elif total_entregado_entregas > 0:
-                        estado_parcial = EstadoLote.objects.get(codigo='RECEPCION_PARCIAL', activo=True)
+                        estado_parcial = obtener_por_codigo(EstadoLote, 'RECEPCION_PARCIAL')
                         lote.estado = estado_parcial
-                        print(f"✅ Lote parcial: {estado_parcial.nombre}")
+                        logger.debug("✅ Lote parcial: %s", estado_parcial.nombre)
 
-                    lote.save()
-                    print(f"✅ Estado del lote actualizado: {lote.estado.nombre}")
+                    # Un solo UPDATE del estado; update() no emite post_save, se invalida a mano
+                    Lote.objects.filter(pk=lote.pk).update(estado=lote.estado, updated_at=timezone.now())
+                    invalidar_cache_lote(lote.pk)
+                    logger.debug("✅ Estado del lote actualizado: %s", lote.estado.nombre)
 
                 except EstadoLote.DoesNotExist as e:
-                    print(f"⚠️ Estado de lote no encontrado: {e}")
+                    logger.debug("⚠️ Estado de lote no encontrado: %s", e)
                 except Exception as e:
-                    print(f"⚠️ Error actualizando estado del lote: {e}")
+                    logger.debug("⚠️ Error actualizando estado del lote: %s", e)
 
                 # Actualizar estadísticas del resultado
                 resultado['importados'] = importados
@@ -1681,93 +1862,17 @@ class ImportacionMasivaView(APIView):
             })
 
         except Exception as e:
-            print(f"💥 ERROR EN MATERIALES NO ÚNICOS: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("💥 ERROR EN MATERIALES NO ÚNICOS: %s", e)
             return Response({
                 'success': False,
                 'error': f'Error procesando materiales no únicos: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    # La plantilla es constante: el navegador puede reutilizarla (privada, el endpoint requiere sesión)
+    @method_decorator(cache_control(private=True, max_age=3600))
     def get(self, request, *args, **kwargs):
         """Obtener documentación y plantillas según tipo de material - MEJORADO"""
-        return Response({
-            'deteccion_automatica': {
-                'descripcion': 'El sistema detecta automáticamente el tipo de material basado en el modelo seleccionado',
-                'flujos': {
-                    'materiales_unicos': 'ONUs y equipos con identificadores únicos (MAC, GPON, etc.)',
-                    'materiales_no_unicos': 'Cables, conectores, materiales por cantidad'
-                }
-            },
-            'materiales_unicos': {
-                'descripcion': 'Para equipos únicos como ONUs',
-                'deteccion': 'Modelo con tipo_material.es_unico = True',
-                'plantilla': {
-                    'columnas_requeridas': ['GPON_SN', 'MAC'],
-                    'columnas_opcionales': ['D_SN'],
-                    'formato_mac': 'XX:XX:XX:XX:XX:XX (mayúsculas, separado por :)',
-                    'formato_gpon': 'Mínimo 8 caracteres (ej: HWTC12345678)',
-                    'formato_d_sn': 'Mínimo 6 caracteres si se proporciona (OPCIONAL)',
-                    'ejemplo': {
-                        'GPON_SN': 'HWTC12345678',
-                        'MAC': '00:11:22:33:44:55',
-                        'D_SN': 'SN123456789 (OPCIONAL)'
-                    }
-                },
-                'item_equipo_info': {
-                    'descripcion': 'El código ITEM_EQUIPO se configura una vez para todo el lote',
-                    'formato': '6-10 dígitos numéricos',
-                    'ejemplo': '1234567890'
-                },
-                'limites': {
-                    'max_filas': 1000,
-                    'validaciones': 'MAC, GPON únicos en sistema y archivo'
-                }
-            },
-            'materiales_no_unicos': {
-                'descripción': 'Para cables, conectores, materiales por cantidad',
-                'deteccion': 'Modelo con tipo_material.es_unico = False',
-                'plantilla': {
-                    'columnas_requeridas': ['CANTIDAD', 'ITEM_EQUIPO'],
-                    'columnas_opcionales': ['OBSERVACIONES', 'LOTE_PROVEEDOR'],
-                    'formato_cantidad': 'Número decimal positivo (ej: 100.5)',
-                    'formato_item_equipo': '6-10 dígitos numéricos por fila',
-                    'ejemplo': {
-                        'CANTIDAD': 100,
-                        'ITEM_EQUIPO': '1234567890',
-                        'OBSERVACIONES': 'Cable fibra óptica monomodo SM',
-                        'LOTE_PROVEEDOR': 'LOTE-2024-001'
-                    }
-                },
-                'limites': {
-                    'max_filas': 100,
-                    'max_cantidad_por_fila': 10000,
-                    'validaciones': 'Cantidad > 0, ITEM_EQUIPO numérico'
-                }
-            },
-            'formatos_archivo_soportados': [
-                {
-                    'tipo': 'Excel',
-                    'extension': '.xlsx',
-                    'descripcion': 'Formato recomendado'
-                },
-                {
-                    'tipo': 'CSV',
-                    'extension': '.csv',
-                    'descripcion': 'Separado por comas, codificación UTF-8'
-                }
-            ],
-            'instrucciones_generales': [
-                '1. El sistema detecta automáticamente si el modelo es único o no',
-                '2. Usar la plantilla correcta según el tipo detectado',
-                '3. No dejar filas vacías entre los datos',
-                '4. Verificar que todos los valores sean únicos donde corresponde',
-                '5. El ITEM_EQUIPO puede ser diferente por fila en materiales no únicos',
-                '6. Las observaciones son opcionales pero recomendadas',
-                '7. Validar siempre antes de importar usando validacion=true'
-            ]
-        })
-
+        return HttpResponse(_PLANTILLA_IMPORTACION_JSON, content_type='application/json')
 
 class LoteDetalleViewSet(viewsets.ModelViewSet):
     """ViewSet para gestión de detalles de lotes"""
@@ -1,7 +1,8 @@
 from datetime import timedelta
 
+from django.core.cache import cache
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Count, Q
 from django.utils import timezone
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
@@ -11,9 +12,11 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import rest_framework as django_filters
 from rest_framework.views import APIView
 
-from .. import models
 from ..models import Material, TipoMaterial, EstadoMaterialONU, Lote, Almacen, Modelo, InspeccionLaboratorio, \
     HistorialMaterial, TipoIngreso
+from ..cache import (
+    obtener_por_codigo, invalidar_cache_lote, clave_estadisticas_materiales, TIEMPO_CACHE_LOTES
+)
 from ..pagination import CustomPageNumberPagination
 from ..serializers import MaterialListSerializer, MaterialDetailSerializer
 
@@ -50,7 +53,7 @@ class MaterialFilter(django_filters.FilterSet):
         """Filtro personalizado para tipo_material por código"""
         if value:
             try:
-                tipo = TipoMaterial.objects.get(codigo=value, activo=True)
+                tipo = obtener_por_codigo(TipoMaterial, value)
                 return queryset.filter(tipo_material=tipo)
             except TipoMaterial.DoesNotExist:
                 return queryset.none()
@@ -89,9 +92,10 @@ class MaterialFilter(django_filters.FilterSet):
 
 class MaterialViewSet(viewsets.ModelViewSet):
     """ViewSet para gestión de materiales (ONUs y otros)"""
+    # Exactamente las relaciones que recorre MaterialListSerializer
     queryset = Material.objects.select_related(
-        'modelo__marca', 'modelo__tipo_material', 'modelo__unidad_medida', 'lote', 'almacen_actual',
-        'estado_onu', 'estado_general', 'tipo_material', 'tipo_origen'
+        'modelo__marca', 'modelo__tipo_material', 'lote__proveedor', 'lote__almacen_destino',
+        'almacen_actual', 'estado_onu', 'estado_general', 'tipo_material'
     ).order_by('-created_at')
 
     pagination_class = CustomPageNumberPagination
@@ -122,7 +126,7 @@ class MaterialViewSet(viewsets.ModelViewSet):
         tipo_material = self.request.query_params.get('tipo_material', 'ONU')
         if tipo_material:
             try:
-                tipo = TipoMaterial.objects.get(codigo=tipo_material, activo=True)
+                tipo = obtener_por_codigo(TipoMaterial, tipo_material)
                 queryset = queryset.filter(tipo_material=tipo)
             except TipoMaterial.DoesNotExist:
                 pass
@@ -132,42 +136,62 @@ class MaterialViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def estadisticas(self, request):
         """Estadísticas de materiales"""
-        queryset = self.filter_queryset(self.get_queryset())
+        clave = clave_estadisticas_materiales(request.query_params)
+        datos = cache.get(clave)
+        if datos is None:
+            datos = self._calcular_estadisticas()
+            cache.set(clave, datos, TIEMPO_CACHE_LOTES)
+        return Response(datos)
+
+    def _calcular_estadisticas(self):
+        """Construir las estadísticas para los filtros de la petición (se cachean en estadisticas)"""
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+
+        # Conteos por estado y por almacén: un GROUP BY cada uno en lugar de un count() por fila
+        conteo_estados = dict(queryset.values_list('estado_onu_id').annotate(total=Count('id')))
+        conteo_almacenes = dict(queryset.values_list('almacen_actual_id').annotate(total=Count('id')))
 
         # Estadísticas por estado
-        estados_stats = {}
-        for estado in EstadoMaterialONU.objects.filter(activo=True):
-            count = queryset.filter(estado_onu=estado).count()
-            estados_stats[estado.nombre] = count
+        estados_stats = {
+            estado.nombre: conteo_estados.get(estado.id, 0)
+            for estado in EstadoMaterialONU.objects.filter(activo=True)
+        }
 
         # Estadísticas por almacén
-        almacenes_stats = {}
-        for almacen in Almacen.objects.filter(activo=True):
-            count = queryset.filter(almacen_actual=almacen).count()
-            if count > 0:
-                almacenes_stats[almacen.nombre] = count
+        almacenes_stats = {
+            almacen.nombre: conteo_almacenes[almacen.id]
+            for almacen in Almacen.objects.filter(activo=True)
+            if conteo_almacenes.get(almacen.id)
+        }
 
         # Estadísticas por lote
         lotes_stats = queryset.values(
             'lote__numero_lote'
         ).annotate(
-            count=models.Count('id')
+            count=Count('id')
         ).order_by('-count')[:10]
 
-        return Response({
-            'total': queryset.count(),
+        # Total, nuevos y reingresados en una sola consulta
+        totales = queryset.aggregate(
+            total=Count('id'),
+            nuevos=Count('id', filter=Q(es_nuevo=True)),
+            reingresados=Count('id', filter=Q(es_nuevo=False))
+        )
+
+        return {
+            'total': totales['total'],
             'por_estado': estados_stats,
             'por_almacen': almacenes_stats,
             'top_lotes': list(lotes_stats),
-            'nuevos': queryset.filter(es_nuevo=True).count(),
-            'reingresados': queryset.filter(es_nuevo=False).count(),
-        })
+            'nuevos': totales['nuevos'],
+            'reingresados': totales['reingresados'],
+        }
 
     @action(detail=False, methods=['get'])
     def solo_onus(self, request):
         """Obtener solo equipos ONUs"""
         try:
-            tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
+            tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
             queryset = self.get_queryset().filter(tipo_material=tipo_onu)
 
             page = self.paginate_queryset(queryset)
@@ -255,14 +279,13 @@ class MaterialViewSet(viewsets.ModelViewSet):
     def defectuosos(self, request):
         """Obtener equipos defectuosos para devolver al sector"""
         try:
-            estado_defectuoso = EstadoMaterialONU.objects.get(codigo='DEFECTUOSO', activo=True)
-            tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
+            estado_defectuoso = obtener_por_codigo(EstadoMaterialONU, 'DEFECTUOSO')
+            tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
 
+            # get_queryset ya une lo que recorre MaterialListSerializer
             materiales = self.get_queryset().filter(
                 tipo_material=tipo_onu,
                 estado_onu=estado_defectuoso
-            ).select_related(
-                'lote__sector_solicitante', 'modelo__marca', 'almacen_actual'
             )
 
             # Filtro opcional por sector
@@ -270,10 +293,10 @@ class MaterialViewSet(viewsets.ModelViewSet):
             if sector_id:
                 materiales = materiales.filter(lote__sector_solicitante_id=sector_id)
 
-            serializer = MaterialListSerializer(materiales, many=True)
+            datos = MaterialListSerializer(materiales, many=True).data
             return Response({
-                'total': materiales.count(),
-                'materiales': serializer.data,
+                'total': len(datos),
+                'materiales': datos,
                 'estado_filtrado': 'DEFECTUOSO'
             })
 
@@ -290,47 +313,57 @@ class MaterialViewSet(viewsets.ModelViewSet):
             return Response({'error': 'IDs de materiales requeridos'}, status=400)
 
         try:
-            estado_defectuoso = EstadoMaterialONU.objects.get(codigo='DEFECTUOSO', activo=True)
-            estado_devuelto = EstadoMaterialONU.objects.get(codigo='DEVUELTO_SECTOR_SOLICITANTE', activo=True)
+            estado_defectuoso = obtener_por_codigo(EstadoMaterialONU, 'DEFECTUOSO')
+            estado_devuelto = obtener_por_codigo(EstadoMaterialONU, 'DEVUELTO_SECTOR_SOLICITANTE')
 
             # Verificar que todos los materiales estén defectuosos
-            materiales = Material.objects.filter(
+            materiales = list(Material.objects.filter(
                 id__in=materiales_ids,
                 estado_onu=estado_defectuoso,
                 tipo_material__es_unico=True
-            )
+            ).select_related('lote__sector_solicitante', 'almacen_actual'))
 
-            if materiales.count() != len(materiales_ids):
+            if len(materiales) != len(materiales_ids):
                 return Response({
                     'error': 'Algunos materiales no están en estado DEFECTUOSO o no existen'
                 }, status=400)
 
+            ahora = timezone.now()
+            sectores_afectados = set()
+            historiales = []
+
+            for material in materiales:
+                # Cambiar estado en memoria; se guarda en un solo bulk_update
+                material.estado_onu = estado_devuelto
+                material.observaciones += f"\n[DEVUELTO SECTOR] {ahora.date()} - {motivo}"
+                material.updated_at = ahora
+
+                sector = material.lote.sector_solicitante
+                if sector:
+                    sectores_afectados.add(sector.nombre)
+
+                historiales.append(HistorialMaterial(
+                    material=material,
+                    estado_anterior='DEFECTUOSO',
+                    estado_nuevo='DEVUELTO_SECTOR_SOLICITANTE',
+                    almacen_anterior=material.almacen_actual,
+                    almacen_nuevo=material.almacen_actual,
+                    motivo=f'Devuelto a sector: {sector.nombre if sector else "Sin sector"}',
+                    observaciones=motivo,
+                    usuario_responsable=request.user
+                ))
+
             with transaction.atomic():
-                count = 0
-                sectores_afectados = set()
-
-                for material in materiales:
-                    # Cambiar estado
-                    material.estado_onu = estado_devuelto
-                    material.observaciones += f"\n[DEVUELTO SECTOR] {timezone.now().date()} - {motivo}"
-                    material.save()
-
-                    # Registrar sector afectado
-                    if material.lote.sector_solicitante:
-                        sectores_afectados.add(material.lote.sector_solicitante.nombre)
-
-                    # Crear historial
-                    HistorialMaterial.objects.create(
-                        material=material,
-                        estado_anterior='DEFECTUOSO',
-                        estado_nuevo='DEVUELTO_SECTOR_SOLICITANTE',
-                        almacen_anterior=material.almacen_actual,
-                        almacen_nuevo=material.almacen_actual,
-                        motivo=f'Devuelto a sector: {material.lote.sector_solicitante.nombre if material.lote.sector_solicitante else "Sin sector"}',
-                        observaciones=motivo,
-                        usuario_responsable=request.user
-                    )
-                    count += 1
+                Material.objects.bulk_update(
+                    materiales, ['estado_onu', 'observaciones', 'updated_at'], batch_size=500
+                )
+                HistorialMaterial.objects.bulk_create(historiales, batch_size=500)
+
+            # bulk_update no emite señales: invalidar la caché de los lotes afectados
+            for lote_id in {material.lote_id for material in materiales}:
+                invalidar_cache_lote(lote_id)
+
+            count = len(materiales)
 
             return Response({
                 'success': True,
@@ -349,14 +382,13 @@ class MaterialViewSet(viewsets.ModelViewSet):
     def devueltos_sector(self, request):
         """Obtener equipos devueltos al sector"""
         try:
-            estado_devuelto = EstadoMaterialONU.objects.get(codigo='DEVUELTO_SECTOR_SOLICITANTE', activo=True)
-            tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
+            estado_devuelto = obtener_por_codigo(EstadoMaterialONU, 'DEVUELTO_SECTOR_SOLICITANTE')
+            tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
 
+            # get_queryset ya une lo que recorre MaterialListSerializer
             materiales = self.get_queryset().filter(
                 tipo_material=tipo_onu,
                 estado_onu=estado_devuelto
-            ).select_related(
-                'lote__sector_solicitante', 'modelo__marca', 'almacen_actual'
             )
 
             # Filtro opcional por sector
@@ -364,10 +396,10 @@ class MaterialViewSet(viewsets.ModelViewSet):
             if sector_id:
                 materiales = materiales.filter(lote__sector_solicitante_id=sector_id)
 
-            serializer = MaterialListSerializer(materiales, many=True)
+            datos = MaterialListSerializer(materiales, many=True).data
             return Response({
-                'total': materiales.count(),
-                'materiales': serializer.data,
+                'total': len(datos),
+                'materiales': datos,
                 'estado_filtrado': 'DEVUELTO_SECTOR_SOLICITANTE'
             })
 
@@ -403,7 +435,7 @@ class ReingresoMaterialView(APIView):
 
             # Validar que el material esté devuelto al proveedor
             try:
-                estado_devuelto = EstadoMaterialONU.objects.get(codigo='DEVUELTO_PROVEEDOR', activo=True)
+                estado_devuelto = obtener_por_codigo(EstadoMaterialONU, 'DEVUELTO_PROVEEDOR')
                 if material_original.estado_onu != estado_devuelto:
                     return Response({
                         'success': False,
@@ -425,13 +457,18 @@ class ReingresoMaterialView(APIView):
                     'error': 'MAC Address y GPON Serial son obligatorios'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            if Material.objects.filter(mac_address=mac_address).exists():
+            # Una sola consulta para ambos identificadores
+            macs_existentes, gpons_existentes, _ = Material.identificadores_existentes(
+                [mac_address], [gpon_serial], []
+            )
+
+            if macs_existentes:
                 return Response({
                     'success': False,
                     'error': f'MAC Address {mac_address} ya existe en el sistema'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            if Material.objects.filter(gpon_serial=gpon_serial).exists():
+            if gpons_existentes:
                 return Response({
                     'success': False,
                     'error': f'GPON Serial {gpon_serial} ya existe en el sistema'
@@ -439,8 +476,8 @@ class ReingresoMaterialView(APIView):
 
             # Obtener estados para el nuevo material
             try:
-                estado_disponible = EstadoMaterialONU.objects.get(codigo='DISPONIBLE', activo=True)
-                tipo_reingreso = TipoIngreso.objects.get(codigo='REINGRESO', activo=True)
+                estado_disponible = obtener_por_codigo(EstadoMaterialONU, 'DISPONIBLE')
+                tipo_reingreso = obtener_por_codigo(TipoIngreso, 'REINGRESO')
             except (EstadoMaterialONU.DoesNotExist, TipoIngreso.DoesNotExist):
                 return Response({
                     'success': False,
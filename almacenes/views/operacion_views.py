@@ -20,6 +20,7 @@ from ..models import (
     EstadoTraspaso,TipoMaterial,
     EstadoMaterialONU, EstadoMaterialGeneral,
 )
+from ..cache import obtener_por_codigo
 from ..serializers import (
     TraspasoAlmacenSerializer, TraspasoCreateSerializer, TraspasoMaterialSerializer,
 )
@@ -53,7 +54,7 @@ class TraspasoAlmacenViewSet(viewsets.ModelViewSet):
         pendientes = self.request.query_params.get('pendientes')
         if pendientes == 'true':
             try:
-                estado_pendiente = EstadoTraspaso.objects.get(codigo='PENDIENTE', activo=True)
+                estado_pendiente = obtener_por_codigo(EstadoTraspaso, 'PENDIENTE')
                 queryset = queryset.filter(estado=estado_pendiente)
             except EstadoTraspaso.DoesNotExist:
                 queryset = queryset.none()
@@ -62,7 +63,7 @@ class TraspasoAlmacenViewSet(viewsets.ModelViewSet):
         en_transito = self.request.query_params.get('en_transito')
         if en_transito == 'true':
             try:
-                estado_transito = EstadoTraspaso.objects.get(codigo='EN_TRANSITO', activo=True)
+                estado_transito = obtener_por_codigo(EstadoTraspaso, 'EN_TRANSITO')
                 queryset = queryset.filter(estado=estado_transito)
             except EstadoTraspaso.DoesNotExist:
                 queryset = queryset.none()
@@ -91,8 +92,8 @@ class TraspasoAlmacenViewSet(viewsets.ModelViewSet):
         traspaso = self.get_object()
 
         try:
-            estado_pendiente = EstadoTraspaso.objects.get(codigo='PENDIENTE', activo=True)
-            estado_transito = EstadoTraspaso.objects.get(codigo='EN_TRANSITO', activo=True)
+            estado_pendiente = obtener_por_codigo(EstadoTraspaso, 'PENDIENTE')
+            estado_transito = obtener_por_codigo(EstadoTraspaso, 'EN_TRANSITO')
         except EstadoTraspaso.DoesNotExist:
             return Response(
                 {'error': 'Estados de traspaso no configurados correctamente'},
@@ -146,8 +147,8 @@ class TraspasoAlmacenViewSet(viewsets.ModelViewSet):
         traspaso = self.get_object()
 
         try:
-            estado_transito = EstadoTraspaso.objects.get(codigo='EN_TRANSITO', activo=True)
-            estado_recibido = EstadoTraspaso.objects.get(codigo='RECIBIDO', activo=True)
+            estado_transito = obtener_por_codigo(EstadoTraspaso, 'EN_TRANSITO')
+            estado_recibido = obtener_por_codigo(EstadoTraspaso, 'RECIBIDO')
         except EstadoTraspaso.DoesNotExist:
             return Response(
                 {'error': 'Estados de traspaso no configurados correctamente'},
@@ -221,9 +222,9 @@ class TraspasoAlmacenViewSet(viewsets.ModelViewSet):
         traspaso = self.get_object()
 
         try:
-            estado_pendiente = EstadoTraspaso.objects.get(codigo='PENDIENTE', activo=True)
-            estado_transito = EstadoTraspaso.objects.get(codigo='EN_TRANSITO', activo=True)
-            estado_cancelado = EstadoTraspaso.objects.get(codigo='CANCELADO', activo=True)
+            estado_pendiente = obtener_por_codigo(EstadoTraspaso, 'PENDIENTE')
+            estado_transito = obtener_por_codigo(EstadoTraspaso, 'EN_TRANSITO')
+            estado_cancelado = obtener_por_codigo(EstadoTraspaso, 'CANCELADO')
         except EstadoTraspaso.DoesNotExist:
             return Response(
                 {'error': 'Estados de traspaso no configurados correctamente'},
@@ -332,10 +333,10 @@ class TraspasoAlmacenViewSet(viewsets.ModelViewSet):
     def _calcular_progreso_traspaso(self, traspaso):
         """Calcular porcentaje de progreso del traspaso"""
         try:
-            estado_pendiente = EstadoTraspaso.objects.get(codigo='PENDIENTE', activo=True)
-            estado_transito = EstadoTraspaso.objects.get(codigo='EN_TRANSITO', activo=True)
-            estado_recibido = EstadoTraspaso.objects.get(codigo='RECIBIDO', activo=True)
-            estado_cancelado = EstadoTraspaso.objects.get(codigo='CANCELADO', activo=True)
+            estado_pendiente = obtener_por_codigo(EstadoTraspaso, 'PENDIENTE')
+            estado_transito = obtener_por_codigo(EstadoTraspaso, 'EN_TRANSITO')
+            estado_recibido = obtener_por_codigo(EstadoTraspaso, 'RECIBIDO')
+            estado_cancelado = obtener_por_codigo(EstadoTraspaso, 'CANCELADO')
 
             if traspaso.estado == estado_pendiente:
                 return 25
@@ -376,7 +377,7 @@ class TraspasoAlmacenViewSet(viewsets.ModelViewSet):
 
         # Tiempo promedio de tránsito
         try:
-            estado_recibido = EstadoTraspaso.objects.get(codigo='RECIBIDO', activo=True)
+            estado_recibido = obtener_por_codigo(EstadoTraspaso, 'RECIBIDO')
             traspasos_completados = TraspasoAlmacen.objects.filter(
                 estado=estado_recibido,
                 fecha_recepcion__isnull=False
@@ -396,10 +397,10 @@ class TraspasoAlmacenViewSet(viewsets.ModelViewSet):
         # Contadores por estado específico
         try:
             pendientes = TraspasoAlmacen.objects.filter(
-                estado=EstadoTraspaso.objects.get(codigo='PENDIENTE', activo=True)
+                estado=obtener_por_codigo(EstadoTraspaso, 'PENDIENTE')
             ).count()
             en_transito = TraspasoAlmacen.objects.filter(
-                estado=EstadoTraspaso.objects.get(codigo='EN_TRANSITO', activo=True)
+                estado=obtener_por_codigo(EstadoTraspaso, 'EN_TRANSITO')
             ).count()
         except EstadoTraspaso.DoesNotExist:
             pendientes = 0
@@ -476,7 +477,7 @@ class TraspasoAlmacenViewSet(viewsets.ModelViewSet):
         try:
             # Traspasos pendientes por más de 3 días
             hace_3_dias = timezone.now() - timedelta(days=3)
-            estado_pendiente = EstadoTraspaso.objects.get(codigo='PENDIENTE', activo=True)
+            estado_pendiente = obtener_por_codigo(EstadoTraspaso, 'PENDIENTE')
 
             traspasos_atrasados = TraspasoAlmacen.objects.filter(
                 estado=estado_pendiente,
@@ -493,7 +494,7 @@ class TraspasoAlmacenViewSet(viewsets.ModelViewSet):
 
             # Traspasos en tránsito por más de 7 días
             hace_7_dias = timezone.now() - timedelta(days=7)
-            estado_transito = EstadoTraspaso.objects.get(codigo='EN_TRANSITO', activo=True)
+            estado_transito = obtener_por_codigo(EstadoTraspaso, 'EN_TRANSITO')
 
             traspasos_transito_largos = TraspasoAlmacen.objects.filter(
                 estado=estado_transito,
@@ -15,10 +15,22 @@ from ..models import (
     TipoMaterial, EstadoMaterialONU, EstadoMaterialGeneral,
     EstadoLote, EstadoTraspaso,
 )
+from ..cache import obtener_por_codigo
 # EstadisticasGeneralesSerializer se usa solo para documentación
 # Las estadísticas se construyen directamente en las views
 
 
+def _q_estado_material(codigo):
+    """Q sobre estado_onu/estado_general activos con ese código, filtrando por id sin JOIN"""
+    condicion = Q(pk__in=[])
+    for modelo, campo in ((EstadoMaterialONU, 'estado_onu_id'), (EstadoMaterialGeneral, 'estado_general_id')):
+        try:
+            condicion |= Q(**{campo: obtener_por_codigo(modelo, codigo).pk})
+        except modelo.DoesNotExist:
+            pass
+    return condicion
+
+
 class EstadisticasGeneralesView(APIView):
     """Vista para estadísticas generales del sistema completo"""
     permission_classes = [IsAuthenticated]
@@ -51,7 +63,7 @@ class EstadisticasGeneralesView(APIView):
         # ===== MATERIALES EN LABORATORIO =====
         # Obtener tipo de material ONU
         try:
-            tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
+            tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
             materiales_laboratorio = Material.objects.filter(
                 tipo_material=tipo_onu,
                 estado_onu__codigo='EN_LABORATORIO'
@@ -60,35 +72,40 @@ class EstadisticasGeneralesView(APIView):
             materiales_laboratorio = 0
 
         # ===== ESTADÍSTICAS POR ALMACÉN =====
+        # Un GROUP BY por almacén con conteos filtrados por id de estado, en lugar de
+        # cinco count() por almacén que unían las tablas de estados
+        conteos_almacen = {
+            fila['almacen_actual_id']: fila
+            for fila in Material.objects.order_by().values('almacen_actual_id').annotate(
+                total=Count('id'),
+                disponibles=Count('id', filter=_q_estado_material('DISPONIBLE')),
+                reservados=Count('id', filter=_q_estado_material('RESERVADO')),
+                en_transito=Count('id', filter=Q(traspaso_actual__isnull=False)),
+                defectuosos=Count('id', filter=_q_estado_material('DEFECTUOSO')),
+            )
+        }
+        conteos_tipo = {
+            (almacen_id, tipo_id): total
+            for almacen_id, tipo_id, total in Material.objects.order_by().values_list(
+                'almacen_actual_id', 'tipo_material_id'
+            ).annotate(total=Count('id'))
+        }
+        tipos_activos = list(TipoMaterial.objects.filter(activo=True))
+
         almacenes_stats = []
         for almacen in Almacen.objects.filter(activo=True):
-            total = almacen.material_set.count()
-
-            # Materiales disponibles (tanto ONU como generales)
-            disponibles = almacen.material_set.filter(
-                Q(estado_onu__codigo='DISPONIBLE', estado_onu__activo=True) |
-                Q(estado_general__codigo='DISPONIBLE', estado_general__activo=True)
-            ).count()
-
-            reservados = almacen.material_set.filter(
-                Q(estado_onu__codigo='RESERVADO', estado_onu__activo=True) |
-                Q(estado_general__codigo='RESERVADO', estado_general__activo=True)
-            ).count()
-
-            en_transito = almacen.material_set.filter(
-                traspaso_actual__isnull=False
-            ).count()
-
-            defectuosos = almacen.material_set.filter(
-                Q(estado_onu__codigo='DEFECTUOSO', estado_onu__activo=True) |
-                Q(estado_general__codigo='DEFECTUOSO', estado_general__activo=True)
-            ).count()
+            conteo = conteos_almacen.get(almacen.id, {})
+            total = conteo.get('total', 0)
+            disponibles = conteo.get('disponibles', 0)
+            reservados = conteo.get('reservados', 0)
+            en_transito = conteo.get('en_transito', 0)
+            defectuosos = conteo.get('defectuosos', 0)
 
             # Por tipo de material
-            por_tipo = {}
-            for tipo in TipoMaterial.objects.filter(activo=True):
-                count = almacen.material_set.filter(tipo_material=tipo).count()
-                por_tipo[tipo.nombre] = count
+            por_tipo = {
+                tipo.nombre: conteos_tipo.get((almacen.id, tipo.id), 0)
+                for tipo in tipos_activos
+            }
 
             almacenes_stats.append({
                 'almacen_id': almacen.id,
@@ -212,10 +229,10 @@ class DashboardView(APIView):
 
         # ===== TAREAS PENDIENTES =====
         try:
-            tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
-            estado_nuevo = EstadoMaterialONU.objects.get(codigo='NUEVO', activo=True)
-            estado_en_laboratorio = EstadoMaterialONU.objects.get(codigo='EN_LABORATORIO', activo=True)
-            estado_en_transito = EstadoTraspaso.objects.get(codigo='EN_TRANSITO', activo=True)
+            tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
+            estado_nuevo = obtener_por_codigo(EstadoMaterialONU, 'NUEVO')
+            estado_en_laboratorio = obtener_por_codigo(EstadoMaterialONU, 'EN_LABORATORIO')
+            estado_en_transito = obtener_por_codigo(EstadoTraspaso, 'EN_TRANSITO')
 
             tareas_pendientes = {
                 'materiales_nuevos_sin_inspeccionar': Material.objects.filter(
@@ -561,23 +578,28 @@ class ReporteEficienciaView(APIView):
         )
 
         # Tiempo promedio en laboratorio
+        # Solo las dos fechas, leídas por bloques: el período puede abarcar miles de materiales
         tiempos_laboratorio = []
-        for material in materiales_laboratorio:
-            if material.fecha_envio_laboratorio and material.fecha_retorno_laboratorio:
-                tiempo = (material.fecha_retorno_laboratorio - material.fecha_envio_laboratorio).total_seconds() / 86400
+        for fecha_envio, fecha_retorno in materiales_laboratorio.values_list(
+                'fecha_envio_laboratorio', 'fecha_retorno_laboratorio'
+        ).iterator(chunk_size=500):
+            if fecha_envio and fecha_retorno:
+                tiempo = (fecha_retorno - fecha_envio).total_seconds() / 86400
                 tiempos_laboratorio.append(tiempo)
 
-        tiempo_promedio_laboratorio = sum(tiempos_laboratorio) / len(tiempos_laboratorio) if tiempos_laboratorio else 0
+        # El filtro exige ambas fechas: hay un tiempo por material, sin volver a contar en la BD
+        total_laboratorio = len(tiempos_laboratorio)
+        tiempo_promedio_laboratorio = sum(tiempos_laboratorio) / total_laboratorio if total_laboratorio else 0
 
         # Tasa de éxito del laboratorio
         try:
-            estado_disponible = EstadoMaterialONU.objects.get(codigo='DISPONIBLE', activo=True)
+            estado_disponible = obtener_por_codigo(EstadoMaterialONU, 'DISPONIBLE')
             exitosos = materiales_laboratorio.filter(estado_onu=estado_disponible).count()
         except EstadoMaterialONU.DoesNotExist:
             exitosos = 0
 
         tasa_exito_laboratorio = (
-                exitosos / materiales_laboratorio.count() * 100) if materiales_laboratorio.count() > 0 else 0
+                exitosos / total_laboratorio * 100) if total_laboratorio > 0 else 0
 
         # ===== ROTACIÓN DE INVENTARIO =====
         materiales_salida = Material.objects.filter(
@@ -637,9 +659,9 @@ class ReporteEficienciaView(APIView):
                 ) if traspasos_periodo.count() > 0 else 100
             },
             'laboratorio': {
-                'total_procesados': materiales_laboratorio.count(),
+                'total_procesados': total_laboratorio,
                 'exitosos': exitosos,
-                'defectuosos': materiales_laboratorio.count() - exitosos,
+                'defectuosos': total_laboratorio - exitosos,
                 'tasa_exito_pct': round(tasa_exito_laboratorio, 1)
             },
             'eficiencia_por_almacen': eficiencia_almacenes
@@ -10,6 +10,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework import filters
 
 from ..models import SectorSolicitante, Material, EstadoMaterialONU, TipoMaterial
+from ..cache import obtener_por_codigo
 from ..serializers import (
     SectorSolicitanteSerializer, DevolucionSectorSerializer,
     ReingresoSectorSerializer, MaterialListSerializer
@@ -60,8 +61,8 @@ class DevolucionSectorView(APIView):
 
     def get(self, request):
         """Obtener materiales defectuosos para devolver"""
-        estado_defectuoso = EstadoMaterialONU.objects.get(codigo='DEFECTUOSO', activo=True)
-        tipo_onu = TipoMaterial.objects.get(codigo='ONU', activo=True)
+        estado_defectuoso = obtener_por_codigo(EstadoMaterialONU, 'DEFECTUOSO')
+        tipo_onu = obtener_por_codigo(TipoMaterial, 'ONU')
 
         materiales = Material.objects.filter(
             tipo_material=tipo_onu,
@@ -94,7 +95,7 @@ class ReingresoSectorView(APIView):
 
     def get(self, request):
         """Obtener materiales devueltos al sector"""
-        estado_devuelto = EstadoMaterialONU.objects.get(codigo='DEVUELTO_SECTOR_SOLICITANTE', activo=True)
+        estado_devuelto = obtener_por_codigo(EstadoMaterialONU, 'DEVUELTO_SECTOR_SOLICITANTE')
 
         materiales = Material.objects.filter(
             estado_onu=estado_devuelto